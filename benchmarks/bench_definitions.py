@@ -0,0 +1,94 @@
+#-------------------------------------------------------------------------------
+# Name:        bench_definitions.py
+# Purpose:     Benchmark of the definition-merge stage. Compares the single
+#              indexed pass of mergeDefinitions in scripts/ncgmp09_definitions.py
+#              with the list.index/remove/insert loop it replaced, on entities
+#              with hundreds of attributes (like wide GeochronPoints or
+#              OrientationPoints tables).
+#
+#              python benchmarks/bench_definitions.py [attributes per entity] [documents]
+#
+# Author:      ethoms
+#
+# Created:     17/10/2026
+# Copyright:   no copyright
+# Licence:     Creative Commons
+#-------------------------------------------------------------------------------
+#!/usr/bin/env python
+
+from __future__ import print_function
+
+import gc
+import os
+import sys
+import time
+import shutil
+import tempfile
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+from ncgmp09_definitions import DefinitionsIndex, mergeDefinitions
+
+def makeDetailed(nAttrs, definition):
+    attrs = ''.join('<attr><attrlabl>Field%d</attrlabl><attrdef>%s %d</attrdef><attrdefs>NCGMP09 v1.1</attrdefs></attr>'
+                    % (i, definition, i) for i in range(nAttrs))
+    return ('<detailed><enttyp><enttypl>WidePoints</enttypl><enttypd>%s</enttypd><enttypds>NCGMP09 v1.1</enttypds></enttyp>%s</detailed>'
+            % (definition, attrs))
+
+def legacyMerge(root, tDefsDict):
+    """The merge loop as it was in addTableFieldDefinitions"""
+
+    for fDet in root.iter('detailed'):
+        entity = fDet.find('enttyp')
+        label = entity[0].text
+        if tDefsDict.hasEntity(label):
+            i = list(fDet).index(entity)
+            fDet.remove(entity)
+            fDet.insert(i, tDefsDict.entity(label))
+            for att in fDet.iter('attr'):
+                attLabel = att[0].text
+                if tDefsDict.hasAttr(label, attLabel):
+                    i = list(fDet).index(att)
+                    fDet.remove(att)
+                    fDet.insert(i, tDefsDict.attr(label, attLabel))
+    return root
+
+def countDefined(roots):
+    return sum(1 for root in roots for attrdef in root.iter('attrdef') if attrdef.text.startswith('Defined'))
+
+def timed(func, docs, index):
+    roots = [ET.fromstring(doc) for doc in docs]
+    gc.collect()
+    start = time.time()
+    for root in roots:
+        func(root, index)
+    return time.time() - start, roots
+
+def main():
+    nAttrs = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    nDocs = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    folder = tempfile.mkdtemp()
+    try:
+        defsPath = os.path.join(folder, 'definitions.xml')
+        with open(defsPath, 'w') as f:
+            f.write('<eainfo>%s</eainfo>' % makeDetailed(nAttrs, 'Defined'))
+        index = DefinitionsIndex(defsPath)
+        index.entities
+
+        docs = ['<metadata><eainfo>%s</eainfo></metadata>' % makeDetailed(nAttrs, 'Exported')] * nDocs
+        print('%d documents, one entity of %d attributes each' % (nDocs, nAttrs))
+
+        lTime, lRoots = timed(legacyMerge, docs, index)
+        mTime, mRoots = timed(mergeDefinitions, docs, index)
+        print('index/remove/insert loop   %8.3f s' % lTime)
+        print('mergeDefinitions           %8.3f s' % mTime)
+        if mTime:
+            print('speed up                   %8.1fx' % (lTime / mTime))
+        print('attributes replaced: loop %d, mergeDefinitions %d of %d'
+              % (countDefined(lRoots), countDefined(mRoots), nAttrs * nDocs))
+    finally:
+        shutil.rmtree(folder)
+
+if __name__ == '__main__':
+    main()
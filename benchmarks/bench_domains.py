@@ -0,0 +1,210 @@
+#-------------------------------------------------------------------------------
+# Name:        bench_domains.py
+# Purpose:     Micro-benchmark of the domain writers. Compares the indexed
+#              ElementTree writer in scripts/ncgmp09_domains.py with the
+#              minidom writeFieldDomain it replaced, on a synthetic metadata
+#              document with large enumerated domains, and the peak memory of
+#              the in-memory writer with the streaming writer (Python 3 only,
+#              it uses tracemalloc). For the peak memory both writers look the
+#              terms up in a LookupIndex over a SQLite Glossary, with the calls
+#              updateDomains makes with and without --stream-domains.
+#
+#              python benchmarks/bench_domains.py [number of terms] [number of fields]
+#
+# Author:      ethoms
+#
+# Created:     17/10/2026
+# Copyright:   no copyright
+# Licence:     Creative Commons
+#-------------------------------------------------------------------------------
+#!/usr/bin/env python
+
+from __future__ import print_function
+
+import gc
+import os
+import sys
+import time
+import shutil
+import sqlite3
+import tempfile
+import xml.etree.ElementTree as ET
+from xml.dom.minidom import parseString
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+from ncgmp09_domains import attrIndex, writeDomains, writeMetadata, StreamedDomains
+from ncgmp09_lookups import LookupIndex
+from ncgmp09_backends import openBackend
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+def makeDocument(nFields, nOther):
+    """Returns the XML text of an eainfo/detailed section with nFields controlled
+       fields (each with a placeholder attrdomv) and nOther plain fields"""
+
+    attrs = []
+    for i in range(nFields + nOther):
+        attrs.append('<attr><attrlabl>Field%d</attrlabl><attrdef>Definition of field %d</attrdef>'
+                     '<attrdefs>NCGMP09 v1.1</attrdefs><attrdomv><udom>Placeholder</udom></attrdomv></attr>' % (i, i))
+    return ('<metadata><eainfo><detailed><enttyp><enttypl>Bench</enttypl></enttyp>%s</detailed></eainfo></metadata>'
+            % ''.join(attrs))
+
+def makeDomains(nFields, nTerms):
+    domains = {}
+    for i in range(nFields):
+        domains['Field%d' % i] = dict(('term%06d' % t, ['Definition of term %d' % t, 'DAS%d' % (t % 50)])
+                                      for t in range(nTerms))
+    return domains
+
+def minidomWriteFieldDomain(fld, defs, dom):
+    """The minidom writer as it was in ncgmp09_update_md.py"""
+
+    labelNodes = dom.getElementsByTagName('attrlabl')
+    for attrlabl in labelNodes:
+        if attrlabl.firstChild.data == fld:
+            attr = attrlabl.parentNode
+            if not len(attr.getElementsByTagName('attrdomv')) == 0:
+                attr.removeChild(attr.getElementsByTagName('attrdomv')[0])
+            for key in sorted(defs):
+                edom = dom.createElement('edom')
+                edomv = dom.createElement('edomv')
+                edomv.appendChild(dom.createTextNode(key))
+                edomvd = dom.createElement('edomvd')
+                edomvd.appendChild(dom.createTextNode(defs[key][0]))
+                edomvds = dom.createElement('edomvds')
+                edomvds.appendChild(dom.createTextNode(defs[key][1]))
+                edom.appendChild(edomv)
+                edom.appendChild(edomvd)
+                edom.appendChild(edomvds)
+                attrdomv = dom.createElement('attrdomv')
+                attrdomv.appendChild(edom)
+                attr.appendChild(attrdomv)
+    return dom
+
+def timed(func, *args):
+    gc.collect()
+    start = time.time()
+    result = func(*args)
+    return time.time() - start, result
+
+def minidomWrite(text, domains):
+    dom = parseString(text)
+    for fld in sorted(domains):
+        dom = minidomWriteFieldDomain(fld, domains[fld], dom)
+    return dom
+
+def elementTreeWrite(text, domains):
+    root = ET.fromstring(text)
+    return writeDomains(root, domains)
+
+def fieldTerms(nFields, nTerms):
+    return dict(('Field%d' % i, ['term%06d' % t for t in range(nTerms)]) for i in range(nFields))
+
+def makeLookupDatabase(folder, nTerms):
+    """Writes a SQLite database with the Glossary and DataSources tables the terms are looked up in"""
+
+    path = os.path.join(folder, 'lookups.sqlite')
+    connection = sqlite3.connect(path)
+    connection.execute('CREATE TABLE Glossary (Term TEXT, Definition TEXT, DefinitionSourceID TEXT)')
+    connection.executemany('INSERT INTO Glossary VALUES (?, ?, ?)',
+                           (('term%06d' % t, 'Definition of term %d' % t, 'DAS%d' % (t % 50)) for t in range(nTerms)))
+    connection.execute('CREATE TABLE DataSources (DataSources_ID TEXT, Source TEXT)')
+    connection.executemany('INSERT INTO DataSources VALUES (?, ?)', (('DAS%d' % i, 'Source %d' % i) for i in range(50)))
+    connection.commit()
+    connection.close()
+    return path
+
+def lookupIndex(db):
+    """A LookupIndex over the database with its tables already read, as they are by the
+       time the domains of the first table are written"""
+
+    lookups = LookupIndex(os.path.join(db, 'Glossary'), os.path.join(db, 'DescriptionOfMapUnits'),
+                          os.path.join(db, 'DataSources'), openBackend(db))
+    lookups.load()
+    return lookups
+
+def writeInMemory(text, terms, lookups, path):
+    """Builds every domain as elements, like updateDomains does by default"""
+    root = ET.fromstring(text)
+    index = attrIndex(root)
+    domains = {}
+    for fld in sorted(terms):
+        domains[fld], cantfind = lookups.resolveTerms(fld, sorted(terms[fld]))
+    writeDomains(root, domains, index)
+    writeMetadata(root, path)
+
+def writeStreamed(text, terms, lookups, path):
+    """Streams every domain to the file, like updateDomains does with --stream-domains"""
+    root = ET.fromstring(text)
+    index = attrIndex(root)
+    streams = StreamedDomains()
+    for fld in sorted(terms):
+        termList = sorted(terms[fld])
+        cantfind = lookups.missingTerms(fld, termList)
+        streams.add(root, fld, lambda fld=fld, termList=termList: lookups.iterDefinitions(fld, termList), index)
+    writeMetadata(root, path, streams)
+
+def peakMemory(func, *args):
+    """Returns the wall time and the peak memory allocated (bytes) while func runs"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.time()
+    func(*args)
+    seconds = time.time() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak
+
+def benchStreaming(text, nFields, nTerms):
+    if tracemalloc is None:
+        print('(peak memory needs tracemalloc, Python 3.4+)')
+        return
+    terms = fieldTerms(nFields, nTerms)
+    folder = tempfile.mkdtemp()
+    try:
+        db = makeLookupDatabase(folder, nTerms)
+        #a new index for each writer, loaded before the memory is traced
+        lookups = lookupIndex(db)
+        mTime, mPeak = peakMemory(writeInMemory, text, terms, lookups, os.path.join(folder, 'memory.xml'))
+        lookups = lookupIndex(db)
+        sTime, sPeak = peakMemory(writeStreamed, text, terms, lookups, os.path.join(folder, 'streamed.xml'))
+        lookups = None
+        same = open(os.path.join(folder, 'memory.xml'), 'rb').read() == open(os.path.join(folder, 'streamed.xml'), 'rb').read()
+    finally:
+        shutil.rmtree(folder)
+    print('                           time       peak memory')
+    print('in-memory domains          %8.3f s %8.1f MB' % (mTime, mPeak / 1048576.0))
+    print('streamed domains           %8.3f s %8.1f MB' % (sTime, sPeak / 1048576.0))
+    print('identical files: %s' % same)
+
+def main():
+    nTerms = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    nFields = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    nOther = 40
+
+    text = makeDocument(nFields, nOther)
+    domains = makeDomains(nFields, nTerms)
+    print('%d controlled fields x %d terms in a document of %d attributes' % (nFields, nTerms, nFields + nOther))
+
+    mTime, dom = timed(minidomWrite, text, domains)
+    mSer, mOut = timed(dom.toxml)
+    dom.unlink()
+    eTime, root = timed(elementTreeWrite, text, domains)
+    eSer, eOut = timed(ET.tostring, root)
+    print('                           write      serialize')
+    print('minidom writeFieldDomain   %8.3f s %8.3f s' % (mTime, mSer))
+    print('ElementTree writeDomains   %8.3f s %8.3f s' % (eTime, eSer))
+    if eTime:
+        print('speed up (write)           %8.1fx' % (mTime / eTime))
+
+    #both writers must produce the same number of enumerated domains
+    mCount = parseString(mOut).getElementsByTagName('edom').length
+    eCount = len(ET.fromstring(eOut).findall('.//edom'))
+    print('enumerated domains written: minidom %d, ElementTree %d' % (mCount, eCount))
+    print('')
+    benchStreaming(text, nFields, nTerms)
+
+if __name__ == '__main__':
+    main()
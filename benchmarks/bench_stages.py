@@ -0,0 +1,190 @@
+#-------------------------------------------------------------------------------
+# Name:        bench_stages.py
+# Purpose:     Stage benchmark of the metadata tools on synthetic NCGMP09
+#              databases of increasing size. For each scale (features x terms)
+#              a GeoPackage is generated with synthetic_db.py, then
+#              ncgmp09_update_md.py is run on it with the native export,
+#              validator and renderer, and glossaryStub.py on a copy of it.
+#              The stage timings the updater reports (export, template,
+#              definitions, domains, mp for the rendering...) and the wall time
+#              of the glossary stub are saved to a JSON file and can be
+#              compared with the results of an earlier (baseline) run.
+#
+#              python benchmarks/bench_stages.py [--scales 1e3x10,1e5x1000] [--output results.json]
+#                                                [--baseline baseline.json] [--python python2.7]
+#
+#              The scripts are run with --python, by default this interpreter;
+#              ncgmp09_update_md.py and glossaryStub.py need Python 2.7.
+#
+# Author:      ethoms
+#
+# Created:     17/10/2026
+# Copyright:   no copyright
+# Licence:     Creative Commons
+#-------------------------------------------------------------------------------
+#!/usr/bin/env python
+
+from __future__ import print_function
+
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+
+from synthetic_db import makeDatabase, makeTemplate
+
+scripts = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts')
+
+#a line of the stage timings ncgmp09_update_md.py prints
+stagePattern = re.compile(r'^\t(\w[\w ()]*?)\s+([\d.]+) s$')
+
+#stages faster than this in the baseline are not compared, their timings are mostly noise
+minimumSeconds = 0.05
+
+def parseScales(text):
+    """'1e3x10,1e5x1000' -> [(1000, 10), (100000, 1000)]"""
+
+    scales = []
+    for item in text.split(','):
+        rows, terms = item.lower().split('x')
+        scales.append((int(float(rows)), int(float(terms))))
+    return scales
+
+def runScript(python, args):
+    """Runs one of the scripts, returning its output and wall time. Raises RuntimeError if it fails"""
+
+    start = time.time()
+    proc = subprocess.Popen([python] + args, cwd=scripts, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    out = proc.communicate()[0].decode('utf-8', 'replace')
+    seconds = time.time() - start
+    if proc.returncode != 0:
+        raise RuntimeError('%s failed:\n%s' % (' '.join(args), out[-2000:]))
+    return out, seconds
+
+def stageTimings(out):
+    """The {stage: seconds} timings in the output of ncgmp09_update_md.py"""
+
+    timings = {}
+    inReport = False
+    for line in out.splitlines():
+        if line.startswith('Stage timings:'):
+            inReport = True
+            continue
+        match = stagePattern.match(line) if inReport else None
+        if match:
+            timings[match.group(1)] = float(match.group(2))
+    return timings
+
+def benchScale(python, folder, rows, terms, glossary, workers):
+    """Generates the database of one scale and times each stage. Returns the result item"""
+
+    gdb = os.path.join(folder, 'bench_%dx%d.gpkg' % (rows, terms))
+    template = os.path.join(folder, 'template.xml')
+    outDir = os.path.join(folder, 'out_%dx%d' % (rows, terms))
+    os.mkdir(outDir)
+
+    start = time.time()
+    counts = makeDatabase(gdb, rows, terms, glossary)
+    makeTemplate(template)
+    generated = time.time() - start
+
+    #the stub adds terms to the Glossary, so it gets a copy of the database
+    stubGdb = os.path.join(folder, 'stub_%dx%d.gpkg' % (rows, terms))
+    shutil.copy(gdb, stubGdb)
+
+    out, wall = runScript(python, ['ncgmp09_update_md.py', gdb, template, 'true', 'true', 'TXT HTML FAQ', outDir,
+                                   '--backend', 'sqlite', '--export', 'native', '--validator', 'native',
+                                   '--renderer', 'native', '--workers', str(workers)])
+    stages = stageTimings(out)
+    stages['update (wall)'] = wall
+    stubOut, stages['glossary stub'] = runScript(python, ['glossaryStub.py', stubGdb])
+
+    return {'rows': rows, 'terms': terms, 'glossary': counts['Glossary'], 'generate': generated,
+            'stages': stages}
+
+def scaleKey(result):
+    return '%dx%d' % (result['rows'], result['terms'])
+
+def printResults(results):
+    stages = []
+    for result in results:
+        for stage in sorted(result['stages']):
+            if not stage in stages:
+                stages.append(stage)
+    print('%-16s' % 'stage' + ''.join('%14s' % scaleKey(r) for r in results))
+    for stage in stages:
+        print('%-16s' % stage + ''.join('%14s' % ('%.2f' % r['stages'][stage] if stage in r['stages'] else '-')
+                                         for r in results))
+
+def compare(results, baseline, threshold):
+    """Prints the ratio of each stage time to the baseline, flagging those slower than threshold.
+       Returns the number of regressions"""
+
+    base = dict((scaleKey(r), r) for r in baseline['results'])
+    regressions = 0
+    print('\nCompared with the baseline (new / baseline):')
+    for result in results:
+        key = scaleKey(result)
+        if not key in base:
+            print('%s: not in the baseline' % key)
+            continue
+        for stage in sorted(result['stages']):
+            before = base[key]['stages'].get(stage)
+            if before is None or before < minimumSeconds:
+                continue
+            ratio = result['stages'][stage] / before
+            flag = ''
+            if ratio > threshold:
+                flag = '  SLOWER'
+                regressions += 1
+            print('%-12s %-16s %8.2f s %8.2f s %6.2fx%s' % (key, stage, before, result['stages'][stage], ratio, flag))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(prog='bench_stages.py')
+    parser.add_argument('--scales', default='1e3x10,1e4x100,1e5x1000',
+                        help='comma separated features x terms per controlled field, eg 1e3x10,1e7x1e5')
+    parser.add_argument('--glossary', type=int, default=None,
+                        help='Glossary rows (default, one for each generated term)')
+    parser.add_argument('--workers', type=int, default=1, help='--workers passed to ncgmp09_update_md.py')
+    parser.add_argument('--python', default=sys.executable, help='interpreter the scripts are run with')
+    parser.add_argument('--output', default=None, help='save the results to this JSON file')
+    parser.add_argument('--baseline', default=None, help='compare with the results saved in this JSON file')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='a stage this many times slower than the baseline is a regression (default 1.25)')
+    parser.add_argument('--keep', action='store_true', help='keep the generated databases and outputs')
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp(prefix='ncgmp09_bench_')
+    results = []
+    try:
+        for rows, terms in parseScales(args.scales):
+            print('%d features, %d terms per field...' % (rows, terms))
+            results.append(benchScale(args.python, folder, rows, terms, args.glossary, args.workers))
+    finally:
+        if args.keep:
+            print('Databases and outputs kept in %s' % folder)
+        else:
+            shutil.rmtree(folder)
+
+    printResults(results)
+    report = {'python': args.python, 'platform': platform.platform(), 'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+              'workers': args.workers, 'results': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=1, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+#-------------------------------------------------------------------------------
+# Name:        synthetic_db.py
+# Purpose:     Generates synthetic NCGMP09 databases for benchmarking, as
+#              GeoPackages the SQLite backend of the scripts can read without
+#              ArcGIS. Every table and field defined in
+#              docs/NCGMP09_entity_definitions.xml is created; the number of
+#              feature rows, the number of distinct terms in each controlled
+#              field and the size of the Glossary are configurable.
+#              Also writes a template metadata record for the benchmark runs.
+#
+#              python benchmarks/synthetic_db.py out.gpkg [--rows N] [--terms N] [--glossary N]
+#
+# Author:      ethoms
+#
+# Created:     17/10/2026
+# Copyright:   no copyright
+# Licence:     Creative Commons
+#-------------------------------------------------------------------------------
+#!/usr/bin/env python
+
+from __future__ import print_function
+
+import os
+import argparse
+import sqlite3
+import xml.etree.ElementTree as ET
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+definitionsPath = os.path.join(root, 'docs', 'NCGMP09_entity_definitions.xml')
+
+#the controlled fields of ncgmp09_update_md.py
+controlledFields = ["Type", "MapUnit", "IdentityConfidence", "ExistenceConfidence", "GeneralLithology",
+                    "GeneralLithologyConfidence", "ParagraphStyle", "Property", "PropertyValue",
+                    "Qualifier", "Event", "TimeScale", "Lithology", "ProportionValue", "ProportionTerm",
+                    "AgeUnits", "DataSourceID"]
+
+#tables that are not feature classes, they hold the terms
+lookupTables = ['Glossary', 'DataSources', 'DescriptionOfMapUnits']
+
+#end of a feature class name: GeoPackage geometry type
+geometryTypes = [('Points', 'POINT'), ('Stations', 'POINT'), ('Polys', 'MULTIPOLYGON'),
+                 ('Lines', 'MULTILINESTRING'), ('ContactsAndFaults', 'MULTILINESTRING')]
+
+#UTM zone 10N, the spatial reference of every feature class
+srsID = 26910
+srsDefinition = ('PROJCS["NAD_1983_UTM_Zone_10N",GEOGCS["GCS_North_American_1983",'
+                 'DATUM["D_North_American_1983",SPHEROID["GRS_1980",6378137.0,298.257222101]],'
+                 'PRIMEM["Greenwich",0.0],UNIT["Degree",0.0174532925199433]],'
+                 'PROJECTION["Transverse_Mercator"],UNIT["Meter",1.0]]')
+
+#rows per executemany call, so very large tables are never held in memory
+chunkSize = 10000
+
+def entityFields(path=definitionsPath):
+    """Returns [(entity label, [attribute labels])] from the definitions file. Entities defined
+       twice get the fields of both definitions"""
+
+    entities = []
+    fields = {}
+    for detailed in ET.parse(path).iter('detailed'):
+        label = detailed.find('enttyp/enttypl').text
+        if not label in fields:
+            fields[label] = []
+            entities.append(label)
+        for attr in detailed.iter('attr'):
+            name = attr.find('attrlabl').text
+            if not name in fields[label]:
+                fields[label].append(name)
+    return [(label, fields[label]) for label in entities]
+
+def geometryType(name):
+    for suffix, gType in geometryTypes:
+        if name.endswith(suffix):
+            return gType
+    return 'GEOMETRY'
+
+def term(fld, i):
+    return '%s term %d' % (fld, i)
+
+def quote(name):
+    return '"%s"' % name.replace('"', '""')
+
+def insertRows(connection, table, fields, rows):
+    query = 'INSERT INTO %s (%s) VALUES (%s)' % (quote(table), ', '.join(quote(f) for f in fields),
+                                                 ', '.join('?' * len(fields)))
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunkSize:
+            connection.executemany(query, chunk)
+            chunk = []
+    if chunk:
+        connection.executemany(query, chunk)
+
+def featureRows(name, fields, count, terms):
+    """Yields count rows of a feature class. Controlled fields cycle through their terms
+       in a scattered order, the ID field is numbered and other fields are empty"""
+
+    idField = name + '_ID'
+    for i in range(count):
+        row = []
+        for fld in fields:
+            if fld in controlledFields:
+                row.append(term(fld, (i * 2654435761) % terms))
+            elif fld == idField:
+                row.append('%s%d' % (name, i))
+            else:
+                row.append(None)
+        yield row
+
+def makeDatabase(path, rows=1000, terms=10, glossary=None, definitions=definitionsPath):
+    """Creates a GeoPackage at path with every NCGMP09 table.
+       rows is the total number of features, shared by the feature classes, terms the number
+       of distinct terms in each controlled field. The Glossary gets the terms of every
+       controlled field it defines (all but MapUnit and DataSourceID) and filler terms up to
+       glossary rows, or only the first glossary terms if that is fewer.
+       Returns a dictionary of {table name: number of rows}"""
+
+    if os.path.exists(path):
+        os.remove(path)
+    entities = entityFields(definitions)
+    features = [(name, fields) for name, fields in entities if not name in lookupTables]
+    counts = {}
+
+    connection = sqlite3.connect(path)
+    with connection:
+        connection.execute('CREATE TABLE gpkg_spatial_ref_sys (srs_name TEXT NOT NULL, srs_id INTEGER PRIMARY KEY, '
+                           'organization TEXT NOT NULL, organization_coordsys_id INTEGER NOT NULL, '
+                           'definition TEXT NOT NULL, description TEXT)')
+        connection.execute('INSERT INTO gpkg_spatial_ref_sys VALUES (?, ?, ?, ?, ?, ?)',
+                           ('NAD_1983_UTM_Zone_10N', srsID, 'EPSG', srsID, srsDefinition, None))
+        connection.execute('CREATE TABLE gpkg_geometry_columns (table_name TEXT NOT NULL, column_name TEXT NOT NULL, '
+                           'geometry_type_name TEXT NOT NULL, srs_id INTEGER NOT NULL, z TINYINT NOT NULL, '
+                           'm TINYINT NOT NULL)')
+
+        for name, fields in entities:
+            columns = ['fid INTEGER PRIMARY KEY AUTOINCREMENT'] + ['%s TEXT(255)' % quote(f) for f in fields]
+            if not name in lookupTables:
+                columns.append('geom BLOB')
+                connection.execute('INSERT INTO gpkg_geometry_columns VALUES (?, ?, ?, ?, 0, 0)',
+                                   (name, 'geom', geometryType(name), srsID))
+            connection.execute('CREATE TABLE %s (%s)' % (quote(name), ', '.join(columns)))
+
+        #feature rows, shared out between the feature classes
+        for i, (name, fields) in enumerate(features):
+            count = rows // len(features) + (1 if i < rows % len(features) else 0)
+            insertRows(connection, name, fields, featureRows(name, fields, count, terms))
+            counts[name] = count
+
+        #the lookup tables define every term
+        insertRows(connection, 'DataSources', ['DataSources_ID', 'Source'],
+                   ([term('DataSourceID', i), 'Source %d' % i] for i in range(terms)))
+        insertRows(connection, 'DescriptionOfMapUnits', ['MapUnit', 'FullName', 'DescriptionSourceID'],
+                   ([term('MapUnit', i), 'Map unit %d' % i, term('DataSourceID', i % terms)] for i in range(terms)))
+        counts['DataSources'] = counts['DescriptionOfMapUnits'] = terms
+
+        glossaryTerms = [term(fld, i) for fld in controlledFields if not fld in ('MapUnit', 'DataSourceID')
+                         for i in range(terms)]
+        if glossary is None:
+            glossary = len(glossaryTerms)
+        glossaryTerms = glossaryTerms[:glossary]
+        glossaryTerms.extend('Filler term %d' % i for i in range(glossary - len(glossaryTerms)))
+        insertRows(connection, 'Glossary', ['Term', 'Definition', 'DefinitionSourceID'],
+                   ([t, 'Definition of %s' % t, term('DataSourceID', i % terms)] for i, t in enumerate(glossaryTerms)))
+        counts['Glossary'] = len(glossaryTerms)
+    connection.close()
+    return counts
+
+def makeTemplate(path):
+    """Writes a template metadata record with the idinfo, dataqual, distinfo and metainfo sections"""
+
+    ET.ElementTree(ET.fromstring(
+        '<metadata><idinfo><citation><citeinfo><origin>Benchmark</origin><pubdate>2026</pubdate>'
+        '<title>Template</title></citeinfo></citation><descript><abstract>Synthetic database.</abstract>'
+        '<purpose>Benchmarking.</purpose></descript><timeperd><timeinfo><sngdate><caldate>2026</caldate>'
+        '</sngdate></timeinfo><current>publication date</current></timeperd><status><progress>Complete'
+        '</progress><update>None planned</update></status><keywords><theme><themekt>None</themekt>'
+        '<themekey>geology</themekey></theme></keywords><accconst>None</accconst><useconst>None</useconst>'
+        '</idinfo><dataqual><logic>Checked.</logic><complete>Complete.</complete><lineage><procstep>'
+        '<procdesc>Generated.</procdesc><procdate>2026</procdate></procstep></lineage></dataqual>'
+        '<distinfo><distrib><cntinfo><cntorgp><cntorg>Benchmark</cntorg></cntorgp></cntinfo></distrib>'
+        '<distliab>None</distliab></distinfo><metainfo><metd>20261017</metd><metc><cntinfo><cntorgp>'
+        '<cntorg>Benchmark</cntorg></cntorgp></cntinfo></metc><metstdn>FGDC Content Standard for Digital '
+        'Geospatial Metadata</metstdn><metstdv>FGDC-STD-001-1998</metstdv></metainfo></metadata>'
+    )).write(path, encoding='utf-8', xml_declaration=True)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='synthetic_db.py')
+    parser.add_argument('path', help='GeoPackage to create')
+    parser.add_argument('--rows', type=int, default=1000, help='total number of features (default 1000)')
+    parser.add_argument('--terms', type=int, default=10, help='distinct terms in each controlled field (default 10)')
+    parser.add_argument('--glossary', type=int, default=None,
+                        help='number of Glossary rows (default, one for each generated term)')
+    parser.add_argument('--template', default=None, help='also write a template metadata record here')
+    args = parser.parse_args()
+
+    counts = makeDatabase(args.path, args.rows, args.terms, args.glossary)
+    for name in sorted(counts):
+        print('%-28s %10d rows' % (name, counts[name]))
+    if args.template:
+        makeTemplate(args.template)
@@ -10,16 +10,39 @@
 #-------------------------------------------------------------------------------
 #!/usr/bin/env python
 
-import arcpy
 import sys
 import os
+import argparse
+from ncgmp09_terms import controlledFieldNames, TermIndex
+from ncgmp09_catalog import Catalog
+from ncgmp09_backends import openBackend
              
 def pPrint(text):
-    print text
-    arcpy.AddMessage(text)
+    try:
+        print text
+    except UnicodeEncodeError:
+        #a console or pipe that cannot show the term
+        print text.encode('ascii', 'backslashreplace')
+    backend.message(text)
     
 gdb = sys.argv[1]
 
+#optional switches after the geodatabase
+parser = argparse.ArgumentParser(prog='glossaryStub.py')
+parser.add_argument('--distinct', action='store_true',
+                    help='ask the data source for the distinct terms in controlled fields (file and enterprise gdbs); '
+                         'the provenance then has no row counts')
+parser.add_argument('--backend', choices=['auto', 'arcpy', 'sqlite'], default='auto',
+                    help='read the database with arcpy or sqlite3; auto uses sqlite3 for .gpkg, .sqlite and .db files')
+parser.add_argument('--provenance', default=None,
+                    help='write the table, field and row count of every term to this .csv or .json file')
+parser.add_argument('--verbose', action='store_true',
+                    help='print every term added to the Glossary with the tables and fields it was found in')
+options = parser.parse_args(sys.argv[2:])
+
+#tables are listed, read and written through arcpy or, for GeoPackages and SQLite databases, sqlite3
+backend = openBackend(gdb, options.backend)
+
 #gdb = r'C:\Workspace\MRP\Baranof\AA_PostZiglerEdits\ForPublication\BaranofIsland.gdb'
 
 pPrint('Looking for controlled field terms in \n%s\n' % gdb)
@@ -29,63 +52,40 @@ controlledFields =["Type", "IdentityConfidence", "ExistenceConfidence", "General
              "Qualifier", "Event", "TimeScale", "Lithology", "ProportionValue", "ProportionTerm",
              "AgeUnits"]   
 
-arcpy.env.workspace = gdb
 #directory the gdb is in 
 gdb_dir = os.path.dirname(gdb)
 
-#get a list of the tables in the geodatabase
-tables = []
-for tab in arcpy.ListTables():
-    tables.append(arcpy.Describe(tab).catalogPath)
-
-#get a list of the feature datasets in the geodatabase
-#when arcpy.env.workspace = arcpy.Describe(fd).catalogPath
-#was used, only the first pass resulted in a full qualified
-#path, the second time I only got the name of the dataset
-#but if I make a list of the catalogPaths, I can pass those items to
-#arcpy.env.workspace
-datasets = []
-for fd in arcpy.ListDatasets():
-    datasets.append(arcpy.Describe(fd).catalogPath)
-
-#run through the datasets and get a list of the feature classes
-for fd in datasets:
-    arcpy.env.workspace = fd
-    for fc in arcpy.ListFeatureClasses():
-        tables.append(arcpy.Describe(fc).catalogPath)
+#describe the tables and feature classes in the geodatabase once
+catalog = Catalog(gdb, backend)
+tables = [obj.catalogPath for obj in catalog.objects]
 
 #run through the fields in the feature classes
-#if any are in controlledFields, pull the values and find unique occurrences
-#termList will be a dictionary formatted as term:(table, field)
-termList = []
+#if any are in controlledFields, read all of them in one pass per table into
+#the index of term: {(table, field): number of rows}
+index = TermIndex()
+nFields = 0
 for t in tables:
-    for fld in arcpy.ListFields(t):
-        if fld.name in controlledFields:
-            rows = arcpy.da.SearchCursor(t, fld.name)
-            for row in rows:
-                if not row[0] in termList and not row[0] == None and not row[0] == "":
-                    s = "Term: {}, Table: {}, Field: {}".format(row[0], os.path.basename(t), fld.name)
-                    pPrint(s)
-                    termList.append(row[0])
+    fields = controlledFieldNames(t, controlledFields, catalog.fieldNames(t))
+    index.scanTable(t, fields, options.distinct, backend)
+    nFields += len(fields)
+pPrint('{} terms found in {} controlled fields'.format(len(index.terms), nFields))
 
-arcpy.env.workspace = gdb
-#get a list of the terms currently in the glossary
-existingTerms = []
-for et in arcpy.da.SearchCursor("Glossary", ["Term"]):
-    existingTerms.append(et[0])
+glossary = os.path.join(gdb, "Glossary")
+#the terms currently in the glossary
+existingTerms = set(row[0] for row in backend.rows(glossary, ["Term"]))
+newTerms = index.missing(existingTerms)
 
-#open an insertCursor and add any new terms
+if options.verbose:
+    for newTerm in newTerms:
+        found = u', '.join(u'{}.{}'.format(table, fld) for table, fld in sorted(index.terms[newTerm]))
+        pPrint(u"Adding {} to Glossary, found in {}".format(newTerm, found))
 
-cursor = arcpy.da.InsertCursor("Glossary", ["Term"])
-for newTerm in termList:
-    if not newTerm in existingTerms:
-        pPrint("Adding {} to Glossary".format(newTerm))
-        cursor.insertRow([newTerm])
+#add the new terms in one insert session
+backend.insertRows(glossary, ["Term"], ([newTerm] for newTerm in newTerms))
+pPrint('{} terms were already in the Glossary, {} added'.format(len(index.terms) - len(newTerms), len(newTerms)))
+
+if options.provenance:
+    index.write(options.provenance)
+    pPrint('Term provenance written to {}'.format(options.provenance))
     
 pPrint("\nDone")
-
-del cursor
-            
-
-        
-
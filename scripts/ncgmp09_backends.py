@@ -0,0 +1,436 @@
+#-------------------------------------------------------------------------------
+# Name:        ncgmp09_backends.py
+# Purpose:     Data access for the metadata tools: listing the tables and
+#              fields of a database, reading rows with a cursor and inserting
+#              rows, behind one small interface.
+#              ArcpyBackend works on anything ArcGIS can open and is the only
+#              place arcpy is imported, when it is selected.
+#              SQLiteBackend works on SQLite databases and GeoPackages (eg, an
+#              NCGMP09 database exported to .gpkg) with the sqlite3 module, so
+#              glossary stubbing and domain building run headless on Linux.
+#
+# Author:      ethoms
+#
+# Created:     17/10/2026
+# Copyright:   no copyright
+# Licence:     Creative Commons
+#-------------------------------------------------------------------------------
+#!/usr/bin/env python
+
+import os
+import re
+import sqlite3
+import threading
+
+#extensions of the databases SQLiteBackend opens when the backend is 'auto'
+sqliteExtensions = ('.gpkg', '.sqlite', '.db')
+
+#workspace factories that accept a DISTINCT prefix in the sql_clause of a cursor
+distinctFactories = ('FileGDBWorkspaceFactory', 'SdeWorkspaceFactory')
+
+#geoprocessing tools are not thread safe, the export and import threads of the
+#pipelined mode take turns running them. The pipeline reads every table it needs
+#before the threads start, so no cursor is open while they run
+toolLock = threading.Lock()
+
+def openBackend(gdb, name='auto'):
+    """Returns the backend for a database. 'auto' picks SQLite for .gpkg, .sqlite
+       and .db files and arcpy for everything else"""
+
+    if name == 'auto':
+        name = 'sqlite' if os.path.splitext(gdb)[1].lower() in sqliteExtensions else 'arcpy'
+    if name == 'sqlite':
+        return SQLiteBackend(gdb)
+    return ArcpyBackend(gdb)
+
+_default = []
+
+def defaultBackend():
+    """The arcpy backend used when a function is not given one, created on first use"""
+
+    if not _default:
+        _default.append(ArcpyBackend())
+    return _default[0]
+
+class ArcpyBackend(object):
+    """Data access through arcpy, imported when the backend is created"""
+
+    name = 'arcpy'
+    #metadata can be exported from and imported back into the gdb
+    storesMetadata = True
+
+    def __init__(self, gdb=None):
+        import arcpy
+        self.arcpy = arcpy
+        self.gdb = gdb
+        #workspace path: True/False, so each workspace is only described once
+        self.distinctSupport = {}
+        #folder of a table: path of its workspace
+        self.workspaces = {}
+
+    def message(self, text):
+        self.arcpy.AddMessage(text)
+
+    def describeObjects(self):
+        """Returns (description, feature dataset name) items for every standalone table
+           and feature class, standalone tables first, then the feature classes of each
+           feature dataset"""
+
+        arcpy = self.arcpy
+        objects = []
+        workspace = arcpy.env.workspace
+        try:
+            arcpy.env.workspace = self.gdb
+            #get a list of the standalone tables in the geodatabase
+            for tab in arcpy.ListTables():
+                objects.append((arcpy.Describe(tab), None))
+
+            #get a list of the feature datasets in the geodatabase
+            #when arcpy.env.workspace = arcpy.Describe(fd).catalogPath
+            #was used, only the first pass resulted in a full qualified
+            #path, the second time I only got the name of the dataset
+            #but if I make a list of the catalogPaths, I can pass those items to
+            #arcpy.env.workspace
+            datasets = []
+            for fd in arcpy.ListDatasets():
+                fdDesc = arcpy.Describe(fd)
+                datasets.append((fdDesc.name, fdDesc.catalogPath))
+
+            #run through the datasets and get a list of the feature classes
+            for name, path in datasets:
+                arcpy.env.workspace = path
+                for fc in arcpy.ListFeatureClasses():
+                    objects.append((arcpy.Describe(fc), name))
+        finally:
+            arcpy.env.workspace = workspace
+        return objects
+
+    def listFields(self, table):
+        return self.arcpy.ListFields(table)
+
+    def exists(self, table):
+        return self.arcpy.Exists(table)
+
+    def rows(self, table, fields, distinct=False):
+        """Yields the rows of a table as tuples of the fields asked for.
+           With distinct, only the distinct rows, found by the data source"""
+
+        sqlClause = ('DISTINCT', None) if distinct else (None, None)
+        with self.arcpy.da.SearchCursor(table, fields, sql_clause=sqlClause) as cursor:
+            for row in cursor:
+                yield row
+
+    def insertRows(self, table, fields, rows):
+        """Inserts every row of an iterable in one cursor session. Returns the number of rows"""
+
+        count = 0
+        cursor = self.arcpy.da.InsertCursor(table, fields)
+        try:
+            for row in rows:
+                cursor.insertRow(row)
+                count += 1
+        finally:
+            del cursor
+        return count
+
+    def parentFolder(self, path):
+        """Return the parent folder path of an ArcCatalog object.
+           Queries dataType because objects within feature datasets have paths
+           which are delimited as if they were system folders when they are not"""
+
+        pFolder = path
+        while not self.arcpy.Describe(pFolder).dataType == 'Folder':
+            pFolder = os.path.split(pFolder)[0]
+        return pFolder
+
+    def workspaceOf(self, table):
+        """Returns the path of the workspace (geodatabase or folder) holding a table.
+           Feature classes in feature datasets have paths delimited as if the
+           dataset were a folder, so walk up until a Workspace is found"""
+
+        folder = os.path.dirname(table)
+        if not folder in self.workspaces:
+            path = folder
+            while path and not self.arcpy.Describe(path).dataType in ('Workspace', 'Folder'):
+                parent = os.path.dirname(path)
+                if parent == path:
+                    break
+                path = parent
+            self.workspaces[folder] = path
+        return self.workspaces[folder]
+
+    def supportsDistinct(self, table):
+        """True if the workspace of a table is one where cursors support SELECT DISTINCT"""
+
+        workspace = self.workspaceOf(table)
+        if not workspace in self.distinctSupport:
+            try:
+                progID = self.arcpy.Describe(workspace).workspaceFactoryProgID
+            except (AttributeError, IOError, RuntimeError):
+                progID = ''
+            self.distinctSupport[workspace] = any(factory in progID for factory in distinctFactories)
+        return self.distinctSupport[workspace]
+
+    def schemaVersion(self):
+        """A value that changes when tables or fields are added or removed, None if it cannot
+           be told, in which case the tables are described again every time"""
+        return None
+
+    def exportMetadata(self, path, translator, out):
+        with toolLock:
+            self.arcpy.ExportMetadata_conversion(path, translator, out)
+
+    def importMetadata(self, source, target):
+        with toolLock:
+            self.arcpy.ImportMetadata_conversion(source, "FROM_FGDC", target)
+
+class Description(object):
+    """The parts of an arcpy Describe object the catalog reads, for SQLite tables"""
+
+    def __init__(self, name, catalogPath, dataType, fields):
+        self.name = name
+        self.catalogPath = catalogPath
+        self.dataType = dataType
+        self.fields = fields
+
+class Field(object):
+    """The parts of an arcpy Field the metadata tools use, for SQLite columns"""
+
+    def __init__(self, name, fieldType, length=0, isNullable=True):
+        self.name = name
+        self.aliasName = name
+        self.type = fieldType
+        self.length = length
+        self.precision = 0
+        self.scale = 0
+        self.isNullable = isNullable
+
+class SpatialReference(object):
+    """The parts of an arcpy SpatialReference the catalog reads, from gpkg_spatial_ref_sys"""
+
+    def __init__(self, name, factoryCode, definition):
+        self.name = name
+        self.factoryCode = factoryCode
+        self.definition = definition or ''
+        if self.definition.startswith('PROJCS'):
+            self.type = 'Projected'
+        elif self.definition.startswith('GEOGCS'):
+            self.type = 'Geographic'
+        else:
+            self.type = 'Unknown'
+        #the last unit of a definition is the unit of the coordinates, linear or angular
+        units = re.findall(r'UNIT\["([^"]+)"', self.definition)
+        unitName = units[-1] if units else ''
+        self.linearUnitName = unitName if self.type == 'Projected' else ''
+        self.angularUnitName = unitName if self.type == 'Geographic' else ''
+
+    def exportToString(self):
+        return self.definition
+
+#declared SQLite column type (start of): field type
+columnTypes = [('INT', 'Integer'), ('CHAR', 'String'), ('TEXT', 'String'), ('CLOB', 'String'),
+               ('REAL', 'Double'), ('FLOA', 'Double'), ('DOUB', 'Double'), ('NUMERIC', 'Double'),
+               ('DATE', 'Date'), ('BLOB', 'Blob')]
+
+#GeoPackage geometry type name: arcpy shape type
+shapeTypes = {'POINT': 'Point', 'MULTIPOINT': 'Multipoint', 'LINESTRING': 'Polyline',
+              'MULTILINESTRING': 'Polyline', 'CURVE': 'Polyline', 'MULTICURVE': 'Polyline',
+              'POLYGON': 'Polygon', 'MULTIPOLYGON': 'Polygon', 'SURFACE': 'Polygon',
+              'MULTISURFACE': 'Polygon', 'GEOMETRY': 'Geometry'}
+
+def quote(name):
+    """An SQL identifier in double quotes"""
+    return '"%s"' % name.replace('"', '""')
+
+class SQLiteBackend(object):
+    """Data access to an SQLite database or GeoPackage with the sqlite3 module.
+       Tables are addressed by catalog paths made as for a gdb, the database path
+       joined with the table name"""
+
+    name = 'sqlite'
+    #there is nowhere to import FGDC metadata into
+    storesMetadata = False
+
+    def __init__(self, gdb):
+        self.gdb = gdb
+        self._connection = None
+        self._features = None
+
+    @property
+    def connection(self):
+        if self._connection is None:
+            #the pipelined mode reads in a thread other than the one that described the tables,
+            #the stages never use the connection at the same time
+            self._connection = sqlite3.connect(self.gdb, check_same_thread=False)
+        return self._connection
+
+    def __getstate__(self):
+        #a connection cannot be sent to another process, it opens its own
+        state = dict(self.__dict__)
+        state['_connection'] = None
+        return state
+
+    def message(self, text):
+        pass
+
+    def tableName(self, table):
+        return os.path.basename(table)
+
+    def hasTable(self, name):
+        query = "SELECT count(*) FROM sqlite_master WHERE type IN ('table', 'view') AND name = ?"
+        return self.connection.execute(query, (name,)).fetchone()[0] > 0
+
+    def features(self):
+        """{table name: (geometry column, geometry type, srs id)} of the feature tables of a GeoPackage"""
+
+        if self._features is None:
+            self._features = {}
+            if self.hasTable('gpkg_geometry_columns'):
+                query = 'SELECT table_name, column_name, geometry_type_name, srs_id FROM gpkg_geometry_columns'
+                self._features = dict((row[0], row[1:]) for row in self.connection.execute(query))
+        return self._features
+
+    def spatialReference(self, srsID):
+        row = None
+        if self.hasTable('gpkg_spatial_ref_sys'):
+            query = 'SELECT srs_name, organization_coordsys_id, definition FROM gpkg_spatial_ref_sys WHERE srs_id = ?'
+            row = self.connection.execute(query, (srsID,)).fetchone()
+        if row is None:
+            return SpatialReference('Unknown', 0, '')
+        return SpatialReference(row[0], row[1], row[2])
+
+    def describeObjects(self):
+        """Returns (description, None) items for every user table in the database, in name order.
+           There are no feature datasets"""
+
+        #a new snapshot, the feature tables may have changed since the last one
+        self._features = None
+        features = self.features()
+        query = "SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY name"
+        objects = []
+        for (name,) in self.connection.execute(query).fetchall():
+            if name.startswith(('sqlite_', 'gpkg_', 'rtree_')):
+                continue
+            path = os.path.join(self.gdb, name)
+            if name in features:
+                column, geometryType, srsID = features[name]
+                desc = Description(name, path, 'FeatureClass', self.listFields(path))
+                desc.shapeType = shapeTypes.get(geometryType.upper(), geometryType)
+                desc.spatialReference = self.spatialReference(srsID)
+            else:
+                desc = Description(name, path, 'Table', self.listFields(path))
+            objects.append((desc, None))
+        return objects
+
+    def listFields(self, table):
+        name = self.tableName(table)
+        geometry = self.features().get(name, (None,))[0]
+        fields = []
+        for cid, column, declared, notNull, default, pk in self.connection.execute('PRAGMA table_info(%s)' % quote(name)):
+            declared = (declared or '').upper()
+            if pk and declared.startswith('INT'):
+                fieldType = 'OID'
+            elif column == geometry:
+                fieldType = 'Geometry'
+            else:
+                fieldType = 'String'
+                for prefix, columnType in columnTypes:
+                    if declared.startswith(prefix):
+                        fieldType = columnType
+                        break
+            length = re.search(r'\((\d+)\)', declared)
+            fields.append(Field(column, fieldType, int(length.group(1)) if length else 0, not notNull))
+        return fields
+
+    def exists(self, table):
+        return self.hasTable(self.tableName(table))
+
+    def rows(self, table, fields, distinct=False):
+        """Yields the rows of a table as tuples of the fields asked for.
+           With distinct, only the distinct rows"""
+
+        query = 'SELECT %s%s FROM %s' % ('DISTINCT ' if distinct else '', ', '.join(quote(f) for f in fields),
+                                         quote(self.tableName(table)))
+        cursor = self.connection.execute(query)
+        try:
+            for row in cursor:
+                yield row
+        finally:
+            cursor.close()
+
+    def insertRows(self, table, fields, rows):
+        """Inserts every row of an iterable in one transaction. Returns the number of rows"""
+
+        query = 'INSERT INTO %s (%s) VALUES (%s)' % (quote(self.tableName(table)), ', '.join(quote(f) for f in fields),
+                                                     ', '.join('?' * len(fields)))
+        count = [0]
+        def counted():
+            for row in rows:
+                count[0] += 1
+                yield tuple(row)
+        with self.connection:
+            self.connection.executemany(query, counted())
+        return count[0]
+
+    def parentFolder(self, path):
+        return os.path.dirname(path)
+
+    def supportsDistinct(self, table):
+        return True
+
+    def schemaVersion(self):
+        """The schema version in the database header, which SQLite changes with every schema change"""
+        return self.connection.execute('PRAGMA schema_version').fetchone()[0]
+
+    def exportMetadata(self, path, translator, out):
+        raise RuntimeError('ExportMetadata_conversion needs the arcpy backend')
+
+    def importMetadata(self, source, target):
+        raise RuntimeError('ImportMetadata_conversion needs the arcpy backend')
+
+class CountingBackend(object):
+    """Wraps a backend, counting the cursors opened, the rows read and the rows inserted
+       for the run statistics. Everything else is passed through.
+       Counts are kept for each thread so the stages of the pipelined mode are told apart"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        #thread: [cursors, rows read, rows inserted]
+        self.threadCounts = {}
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+    def counts(self):
+        """The [cursors, rows read, rows inserted] counts of the calling thread"""
+
+        return self.threadCounts.setdefault(threading.current_thread().ident, [0, 0, 0])
+
+    def total(self, i):
+        return sum(c[i] for c in list(self.threadCounts.values()))
+
+    @property
+    def cursors(self):
+        return self.total(0)
+
+    @property
+    def rowsRead(self):
+        return self.total(1)
+
+    @property
+    def rowsInserted(self):
+        return self.total(2)
+
+    def rows(self, table, fields, distinct=False):
+        counts = self.counts()
+        counts[0] += 1
+        for row in self.backend.rows(table, fields, distinct):
+            counts[1] += 1
+            yield row
+
+    def insertRows(self, table, fields, rows):
+        counts = self.counts()
+        counts[0] += 1
+        count = self.backend.insertRows(table, fields, rows)
+        counts[2] += count
+        return count
@@ -0,0 +1,214 @@
+#-------------------------------------------------------------------------------
+# Name:        ncgmp09_batch.py
+# Purpose:     Runs ncgmp09_update_md.py on a batch of NCGMP09 geodatabases,
+#              eg, all of the quadrangles of a release, in one launch.
+#              The gdbs are given as a list and/or glob patterns separated by
+#              semicolons, each gets its own output directory (named after
+#              the gdb, so no two may have the same name) under the output
+#              folder. The gdbs are shared out to a pool of worker processes;
+#              each process imports arcpy and parses the template and
+#              NCGMP09_entity_definitions.xml once for all of the gdbs it
+#              processes. A combined summary of the timings and of the terms
+#              without definitions in each gdb is printed at the end and can
+#              be saved as JSON.
+#
+#              python ncgmp09_batch.py "D:/release/*.gdb;D:/extra/Quad.gdb" template.xml true true
+#                                      "TXT HTML FAQ" D:/release/metadata [--batch-workers N]
+#                                      [--summary summary.json] [ncgmp09_update_md.py options]
+#
+# Author:      ethoms
+#
+# Created:     17/10/2026
+# Copyright:   no copyright
+# Licence:     Creative Commons
+#-------------------------------------------------------------------------------
+#!/usr/bin/env python
+
+import os
+import sys
+import glob
+import time
+import argparse
+import traceback
+import multiprocessing
+import ncgmp09_update_md
+from ncgmp09_stats import StageTimer, writeReport
+
+def pPrint(text):
+    print text
+
+def gdbList(text):
+    """The gdbs of a list of paths and glob patterns separated by semicolons, in order and
+       without duplicates. Paths that do not exist are left out"""
+
+    gdbs = []
+    for item in text.split(';'):
+        item = item.strip().strip("'\"")
+        if not item:
+            continue
+        if glob.has_magic(item):
+            matches = sorted(glob.glob(item))
+            if not matches:
+                pPrint('No geodatabases match %s' % item)
+        elif os.path.exists(item):
+            matches = [item]
+        else:
+            pPrint('%s does not exist' % item)
+            matches = []
+        for gdb in matches:
+            gdb = os.path.normpath(gdb)
+            if not gdb in gdbs:
+                gdbs.append(gdb)
+    return gdbs
+
+def outputFolder(outRoot, gdb):
+    """The output directory of one gdb, named after it"""
+
+    return os.path.join(outRoot, os.path.splitext(os.path.basename(gdb))[0])
+
+def sharedOutputs(gdbs):
+    """{output directory name: [gdbs]} of the gdbs that would share an output directory,
+       eg, two Quad.gdb in different folders"""
+
+    byName = {}
+    for gdb in gdbs:
+        byName.setdefault(os.path.normcase(outputFolder('', gdb)), []).append(gdb)
+    return dict((name, paths) for name, paths in byName.items() if len(paths) > 1)
+
+def runGdb(argv):
+    """Updates the metadata of one gdb in a worker process, keeping its messages for the
+       parent process to print. Returns the gdb, its messages and the summary of the run,
+       or None and the traceback if it failed"""
+
+    ncgmp09_update_md.workerMessages = []
+    try:
+        summary = ncgmp09_update_md.run(argv)
+        failure = None
+    except Exception:
+        summary = None
+        failure = traceback.format_exc()
+    messages = ncgmp09_update_md.workerMessages
+    ncgmp09_update_md.workerMessages = None
+    return argv[1], messages, summary, failure
+
+def runInProcess(argv):
+    """Updates the metadata of one gdb in this process, printing as it goes"""
+
+    try:
+        return argv[1], [], ncgmp09_update_md.run(argv), None
+    except Exception:
+        return argv[1], [], None, traceback.format_exc()
+
+def reportBatch(results, seconds):
+    """Prints the combined summary of a batch: each gdb's tables and time, the stage timings
+       of all of the gdbs and the undefined terms of each field with the gdbs they are in.
+       Returns the combined StageTimer and the undefined terms"""
+
+    timer = StageTimer()
+    #field: {term: [gdb names]}
+    undefined = {}
+    pPrint('\nBatch summary: %d geodatabases in %.2f s' % (len(results), seconds))
+    for gdb, messages, summary, failure in results:
+        name = os.path.basename(gdb)
+        if failure:
+            pPrint('\t%-30s FAILED' % name)
+            continue
+        pPrint('\t%-30s %4d of %4d tables %8.2f s%s' % (name, summary['tablesRebuilt'], summary['tablesTotal'],
+                                                        summary['seconds'],
+                                                        ' INCOMPLETE' if summary['tablesNotRendered'] else ''))
+        timer.merge(summary['timer'])
+        for table, fields in summary['undefinedTerms'].items():
+            for fld, terms in fields.items():
+                for term in terms:
+                    gdbs = undefined.setdefault(fld, {}).setdefault(term, [])
+                    if not name in gdbs:
+                        gdbs.append(name)
+    timer.report(pPrint)
+
+    if undefined:
+        pPrint('Terms without definitions:')
+        for fld in sorted(undefined):
+            pPrint('\t%s' % fld)
+            for term in sorted(undefined[fld]):
+                pPrint('\t\t%s: %s' % (term, ', '.join(undefined[fld][term])))
+    for gdb, messages, summary, failure in results:
+        if failure:
+            pPrint('%s failed:\n%s' % (gdb, failure))
+    return timer, undefined
+
+def parseOptions(args):
+    """Parses the batch switches, the rest are passed on to ncgmp09_update_md.py"""
+
+    parser = argparse.ArgumentParser(prog='ncgmp09_batch.py')
+    parser.add_argument('--batch-workers', type=int, default=1,
+                        help='number of worker processes, each processing whole gdbs; 0 for one per CPU (default 1)')
+    parser.add_argument('--summary', default=None,
+                        help='write the combined summary of the batch to this JSON file')
+    return parser.parse_known_args(args)
+
+def main():
+    gdbs = gdbList(sys.argv[1])
+    outRoot = sys.argv[6]
+    options, passed = parseOptions(sys.argv[7:])
+    workers = options.batch_workers
+    if workers < 1:
+        workers = multiprocessing.cpu_count()
+    workers = min(workers, len(gdbs)) or 1
+
+    #gdbs with the same name would write to the same output directory, journal and manifest
+    shared = sharedOutputs(gdbs)
+    if shared:
+        pPrint('These geodatabases would share an output directory, rename them or run them in separate batches:')
+        for name in sorted(shared):
+            pPrint('\t%s: %s' % (name, ', '.join(shared[name])))
+        sys.exit(1)
+
+    pPrint('NCGMP09 batch: %d geodatabases' % len(gdbs))
+    script = os.path.abspath(ncgmp09_update_md.__file__)
+    jobs = []
+    for gdb in gdbs:
+        outDir = outputFolder(outRoot, gdb)
+        if not os.path.isdir(outDir):
+            os.makedirs(outDir)
+        argv = [script, gdb] + sys.argv[2:6] + [outDir] + passed
+        if workers > 1:
+            #the batch workers cannot start pools of their own
+            argv += ['--workers', '1', '--mp-workers', '1']
+        jobs.append(argv)
+
+    start = time.time()
+    if workers <= 1:
+        results = [runInProcess(argv) for argv in jobs]
+    else:
+        ncgmp09_update_md.poolExecutable()
+        results = []
+        pool = multiprocessing.Pool(workers)
+        try:
+            for result in pool.imap(runGdb, jobs):
+                pPrint('\n' + '\n'.join(result[1]))
+                results.append(result)
+            pool.close()
+        except:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+    seconds = time.time() - start
+
+    timer, undefined = reportBatch(results, seconds)
+    if options.summary:
+        gdbSummaries = []
+        for gdb, messages, summary, failure in results:
+            if summary is not None:
+                summary = dict(summary)
+                summary['timer'] = summary['timer'].asDict()
+            gdbSummaries.append({'gdb': gdb, 'summary': summary, 'failure': failure})
+        writeReport(options.summary, timer, {'gdbs': gdbSummaries, 'seconds': seconds, 'workers': workers,
+                                             'undefinedTerms': undefined})
+        pPrint('Batch summary written to %s' % options.summary)
+    #failed gdbs, and gdbs whose outputs were not all written
+    if [result for result in results if result[3] or result[2]['tablesNotRendered']]:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+#-------------------------------------------------------------------------------
+# Name:        ncgmp09_catalog.py
+# Purpose:     A snapshot of the catalog of an NCGMP09 geodatabase: the names,
+#              catalog paths, feature dataset membership, field schemas and
+#              spatial references of every standalone table and feature class.
+#              Built once per run from the data-access backend so that each
+#              object is only described once. Holds plain Python values only
+#              so it can be sent to worker processes.
+#
+# Author:      ethoms
+#
+# Created:     17/10/2026, from tableList of ncgmp09_update_md.py
+#              (17/04/2015)
+# Copyright:   no copyright
+# Licence:     Creative Commons
+#-------------------------------------------------------------------------------
+#!/usr/bin/env python
+
+from ncgmp09_backends import openBackend
+
+class FieldSchema(object):
+    """The parts of an arcpy Field the metadata tools use"""
+
+    def __init__(self, fld):
+        self.name = fld.name
+        self.aliasName = fld.aliasName
+        self.type = fld.type
+        self.length = fld.length
+        self.precision = fld.precision
+        self.scale = fld.scale
+        self.isNullable = fld.isNullable
+
+class CatalogObject(object):
+    """One standalone table or feature class"""
+
+    def __init__(self, desc, dataset=None):
+        self.name = desc.name
+        self.catalogPath = desc.catalogPath
+        self.dataType = desc.dataType
+        #name of the feature dataset holding a feature class, None for standalone tables
+        self.dataset = dataset
+        self.fields = [FieldSchema(fld) for fld in desc.fields]
+        self.shapeType = None
+        self.spatialReference = None
+        if hasattr(desc, 'shapeType'):
+            self.shapeType = desc.shapeType
+            sr = desc.spatialReference
+            self.spatialReference = {'name': sr.name, 'factoryCode': sr.factoryCode, 'type': sr.type,
+                                     'linearUnitName': getattr(sr, 'linearUnitName', ''),
+                                     'angularUnitName': getattr(sr, 'angularUnitName', ''),
+                                     'XYResolution': getattr(sr, 'XYResolution', None),
+                                     'exportString': sr.exportToString()}
+
+    @property
+    def fieldNames(self):
+        return [fld.name for fld in self.fields]
+
+class Catalog(object):
+    """Every standalone table and feature class of a geodatabase, in the order
+       tableList has always listed them: standalone tables first, then the
+       feature classes of each feature dataset"""
+
+    def __init__(self, gdb, backend=None):
+        self.gdb = gdb
+        self.objects = []
+        self.byName = {}
+        self.byPath = {}
+
+        if backend is None:
+            backend = openBackend(gdb, 'arcpy')
+        for desc, dataset in backend.describeObjects():
+            self.add(CatalogObject(desc, dataset))
+
+    def add(self, obj):
+        self.objects.append(obj)
+        self.byName[obj.name] = obj
+        self.byPath[obj.catalogPath] = obj
+
+    def get(self, table):
+        """Returns the CatalogObject for a table name or catalog path, None if it is not in the gdb"""
+        return self.byPath.get(table) or self.byName.get(table)
+
+    def tableList(self):
+        """Returns a list of [name, catalog path] items for all tables and feature classes"""
+        return [[obj.name, obj.catalogPath] for obj in self.objects]
+
+    def fieldNames(self, table):
+        """Returns the field names of a table (name or catalog path)"""
+        return self.get(table).fieldNames
@@ -0,0 +1,171 @@
+#-------------------------------------------------------------------------------
+# Name:        ncgmp09_definitions.py
+# Purpose:     Compiled index of /docs/NCGMP09_entity_definitions.xml.
+#              Maps each entity (table) label to its enttyp element and its
+#              attr elements by attribute label. The index is saved to a cache
+#              file next to the definitions file, keyed on the size, mtime and
+#              hash of the source, and loaded lazily on the first lookup so the
+#              definitions file is only parsed when it has changed.
+#              mergeDefinitions swaps the definitions into a metadata document
+#              in a single indexed pass over each detailed element.
+#
+# Author:      ethoms
+#
+# Created:     17/10/2026, from addTableFieldDefinitions of ncgmp09_update_md.py
+#              (17/04/2015)
+# Copyright:   no copyright
+# Licence:     Creative Commons
+#-------------------------------------------------------------------------------
+#!/usr/bin/env python
+
+import os
+import json
+import hashlib
+import xml.etree.ElementTree as ET
+from ncgmp09_journal import replaceFile
+
+#bump when the layout of the cache file changes
+cacheVersion = 1
+
+def elementText(elem):
+    """Serializes an element to [ASCII XML text, tail]. Anything outside ASCII is written
+       as character references. The tail keeps the indenting of the definitions file"""
+
+    text = ET.tostring(elem)
+    if not isinstance(text, str):
+        text = text.decode('ascii')
+    return [text, elem.tail]
+
+def makeElement(item):
+    """Makes a new element from an [XML text, tail] item of the index"""
+
+    elem = ET.fromstring(item[0])
+    elem.tail = item[1]
+    return elem
+
+def sourceHash(path):
+    sha = hashlib.sha1()
+    with open(path, 'rb') as f:
+        sha.update(f.read())
+    return sha.hexdigest()
+
+def compileDefinitions(path):
+    """Parses the definitions file and returns {entity label: {'enttyp': [xml text, tail],
+       'attrs': {attribute label: [xml text, tail]}}}"""
+
+    entities = {}
+    for detailed in ET.parse(path).iter('detailed'):
+        entity = detailed.find('enttyp')
+        if entity is None or entity.find('enttypl') is None:
+            continue
+        label = entity.find('enttypl').text
+        attrs = {}
+        for attr in detailed.iter('attr'):
+            attrs[attr[0].text] = elementText(attr)
+        entities[label] = {'enttyp': elementText(entity), 'attrs': attrs}
+    return entities
+
+class DefinitionsIndex(object):
+    """Entity and attribute definitions looked up by label.
+       entity() and attr() return a new element every time, ready to be
+       inserted into a metadata document"""
+
+    def __init__(self, path, cachePath=None):
+        self.path = path
+        self.cachePath = cachePath or path + '.cache.json'
+        self._entities = None
+
+    @property
+    def entities(self):
+        if self._entities is None:
+            self._entities = self.load()
+        return self._entities
+
+    def load(self):
+        """Returns the compiled index from the cache file if it was made from the current
+           definitions file, otherwise compiles the definitions and rewrites the cache"""
+
+        stat = os.stat(self.path)
+        cache = None
+        if os.path.exists(self.cachePath):
+            try:
+                with open(self.cachePath) as f:
+                    cache = json.load(f)
+            except ValueError:
+                cache = None
+
+        if cache is not None and cache.get('version') == cacheVersion and cache.get('size') == stat.st_size:
+            if cache.get('mtime') == stat.st_mtime:
+                return cache['entities']
+            #touched but maybe not changed, the hash decides
+            digest = sourceHash(self.path)
+            if cache.get('sha1') == digest:
+                cache['mtime'] = stat.st_mtime
+                self.save(cache)
+                return cache['entities']
+
+        entities = compileDefinitions(self.path)
+        self.save({'version': cacheVersion, 'size': stat.st_size, 'mtime': stat.st_mtime,
+                   'sha1': sourceHash(self.path), 'entities': entities})
+        return entities
+
+    def save(self, cache):
+        """Writes the cache file. The docs folder may be read-only, in which case
+           the definitions are just compiled again next time"""
+
+        #write to a file of our own and rename it so worker processes never read half a cache
+        tmpPath = '%s.%d' % (self.cachePath, os.getpid())
+        try:
+            with open(tmpPath, 'w') as f:
+                json.dump(cache, f)
+            replaceFile(tmpPath, self.cachePath)
+        except (IOError, OSError):
+            if os.path.exists(tmpPath):
+                os.remove(tmpPath)
+
+    def hasEntity(self, label):
+        return label in self.entities
+
+    def hasAttr(self, label, attLabel):
+        return label in self.entities and attLabel in self.entities[label]['attrs']
+
+    def entity(self, label):
+        """A new enttyp element for an entity label"""
+        return makeElement(self.entities[label]['enttyp'])
+
+    def attr(self, label, attLabel):
+        """A new attr element for an attribute label of an entity"""
+        return makeElement(self.entities[label]['attrs'][attLabel])
+
+def mergeDefinitions(root, index):
+    """Replaces the enttyp and attr elements of every detailed element in a metadata
+       document with the definitions from the index.
+       Each detailed element is walked once: the new children are put in a list by
+       position and swapped in with one slice assignment, rather than looking up the
+       position of and removing/inserting each attr in turn.
+       Returns a list of (entity label, [attribute labels]) of what was replaced"""
+
+    updated = []
+    #there 'should' be only one detailed element per feature class or table metadata record
+    #but we'll go through all of them in case there are more
+    for fDet in root.iter('detailed'):
+        entity = fDet.find('enttyp')
+        if entity is None or len(entity) == 0:
+            continue
+        label = entity[0].text
+        if not index.hasEntity(label):
+            continue
+
+        children = list(fDet)
+        attLabels = []
+        for i, child in enumerate(children):
+            if child.tag == 'enttyp':
+                children[i] = index.entity(label)
+            elif child.tag == 'attr':
+                attrlabl = child.find('attrlabl')
+                if attrlabl is not None and index.hasAttr(label, attrlabl.text):
+                    children[i] = index.attr(label, attrlabl.text)
+                    attLabels.append(attrlabl.text)
+        fDet[:] = children
+        updated.append((label, attLabels))
+    return updated
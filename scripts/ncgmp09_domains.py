@@ -0,0 +1,198 @@
+#-------------------------------------------------------------------------------
+# Name:        ncgmp09_domains.py
+# Purpose:     Writes the Attribute_Domain_Values of controlled fields into
+#              FGDC metadata documents with ElementTree.
+#              A label:attr index is built once per document and every
+#              enumerated domain is replaced in a single pass over that index.
+#              Rendered domains are cached by (field, set of terms) so a domain
+#              shared by many tables of a gdb is only built once per run.
+#              Very large domains can instead be streamed: the attr gets a
+#              placeholder and the attrdomv/edom sequence is written straight
+#              to the output file from a sorted iterator of (term, definition,
+#              source) when the document is serialized.
+#
+# Author:      ethoms
+#
+# Created:     17/10/2026, from writeFieldDomain of ncgmp09_update_md.py
+#              (17/04/2015)
+# Copyright:   no copyright
+# Licence:     Creative Commons
+#-------------------------------------------------------------------------------
+#!/usr/bin/env python
+
+import sys
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape
+
+##element tag names are
+## attr             = Attribute
+## attrlabl         = Attribute_Label
+## attrdomv         = Attribute_Domain_Values
+## edom             = Enumerated_Domain
+## edomv            = Enumerated_Domain_Value
+## edomvd           = Enumerated_Domain_Value_Definition
+## edomvds          = Enumerated_Domain_Value_Definition_Source
+
+def attrIndex(root):
+    """Returns a dictionary of {Attribute_Label: [attr elements]} for a metadata document.
+       There is usually one attr per label but there may be more if the document
+       has more than one detailed element"""
+
+    index = {}
+    for attr in root.iter('attr'):
+        attrlabl = attr.find('attrlabl')
+        if attrlabl is not None and attrlabl.text:
+            index.setdefault(attrlabl.text.strip(), []).append(attr)
+    return index
+
+def renderDomain(defs):
+    """Returns a list of attrdomv elements, one enumerated domain for each of the
+       term:(definition, source) items in defs, sorted by term"""
+
+    attrdomvs = []
+    for key in sorted(defs):
+        #one attribute domain values node per enumerated domain
+        attrdomv = ET.Element('attrdomv')
+        edom = ET.SubElement(attrdomv, 'edom')
+        ET.SubElement(edom, 'edomv').text = key
+        ET.SubElement(edom, 'edomvd').text = defs[key][0]
+        ET.SubElement(edom, 'edomvds').text = defs[key][1]
+        attrdomvs.append(attrdomv)
+    return attrdomvs
+
+class FragmentCache(object):
+    """Rendered attrdomv elements keyed on (field, frozenset of terms), shared by all the
+       documents of a run. The elements are spliced into every document that has the
+       same domain; documents are only written after the domain stage, never edited"""
+
+    def __init__(self):
+        self.fragments = {}
+        self.rendered = 0
+        self.reused = 0
+
+    def attrdomvs(self, fld, defs):
+        key = (fld, frozenset(defs))
+        if key in self.fragments:
+            self.reused += 1
+        else:
+            self.fragments[key] = renderDomain(defs)
+            self.rendered += 1
+        return self.fragments[key]
+
+def writeAttrDomain(attr, defs, attrdomvs=None):
+    """Replaces the Attribute_Domain_Values of one attr element with an enumerated
+       domain for each of the term:(definition, source) items in defs, or with the
+       already rendered attrdomvs"""
+
+    #remove any attrdomv already in this node.
+    #there is a placeholder for it in NCGMP09_entity_definitions.xml in case no enumerated domain
+    #values are found and a previous run will have left its own enumerated domains behind
+    for attrdomv in attr.findall('attrdomv'):
+        attr.remove(attrdomv)
+
+    if attrdomvs is None:
+        attrdomvs = renderDomain(defs)
+    attr.extend(attrdomvs)
+
+def writeDomains(root, domains, index=None, cache=None):
+    """Write the enumerated domains of several fields to a metadata document.
+       domains is a dictionary of {field name: {term: (definition, source)}}.
+       The label:attr index is built once (or passed in) and each field is
+       written with one dictionary lookup instead of a scan of the document.
+       With a FragmentCache, a domain already rendered for another table is reused"""
+
+    if index is None:
+        index = attrIndex(root)
+    for fld, defs in domains.items():
+        attrs = index.get(fld, [])
+        if not attrs:
+            continue
+        attrdomvs = None
+        if cache is not None:
+            attrdomvs = cache.attrdomvs(fld, defs)
+        for attr in attrs:
+            #without a cache each attr gets its own elements
+            writeAttrDomain(attr, defs, attrdomvs)
+    return root
+
+def edomText(value):
+    """The text of one edomv, edomvd or edomvds value, escaped for XML"""
+
+    if not isinstance(value, ("".__class__, u"".__class__)):
+        value = str(value)
+    return escape(value)
+
+def edomXML(term, definition, source):
+    """The attrdomv/edom elements of one term, serialized the way ElementTree would"""
+
+    parts = ['<attrdomv><edom>']
+    for tag, value in (('edomv', term), ('edomvd', definition), ('edomvds', source)):
+        if value:
+            parts.append('<%s>%s</%s>' % (tag, edomText(value), tag))
+        else:
+            parts.append('<%s />' % tag)
+    parts.append('</edom></attrdomv>')
+    return ''.join(parts)
+
+class StreamedDomains(object):
+    """Enumerated domains of a metadata document that are written to the output file
+       from iterators when the document is serialized, so the terms never become
+       elements in memory"""
+
+    def __init__(self):
+        #placeholder comment text: function returning a sorted iterator of (term, definition, source)
+        self.sources = {}
+
+    def add(self, root, fld, rows, index=None):
+        """Replaces the domain of a field with a placeholder. rows is a function returning a
+           new sorted iterator of (term, definition, source) items each time it is called"""
+
+        if index is None:
+            index = attrIndex(root)
+        for attr in index.get(fld, []):
+            for attrdomv in attr.findall('attrdomv'):
+                attr.remove(attrdomv)
+            marker = 'ncgmp09-domain-%d' % len(self.sources)
+            placeholder = ET.Comment(marker)
+            attr.append(placeholder)
+            self.sources['<!--%s-->' % marker] = rows
+
+    def write(self, root, path):
+        """Serializes the document to path, streaming each placeholder's domain in its place"""
+
+        with open(path, 'wb') as f:
+            writer = StreamWriter(f, self.sources)
+            if sys.version_info[0] >= 3:
+                f.write(b"<?xml version='1.0' encoding='utf-8'?>\n")
+                ET.ElementTree(root).write(writer, encoding='unicode')
+            else:
+                ET.ElementTree(root).write(writer, encoding='utf-8', xml_declaration=True)
+
+class StreamWriter(object):
+    """File-like object handed to ElementTree.write. ElementTree writes a comment
+       in one piece, so a write of a placeholder comment is swapped for the streamed domain"""
+
+    def __init__(self, f, sources):
+        self.f = f
+        self.sources = sources
+
+    def write(self, data):
+        rows = self.sources.get(data)
+        if rows is None:
+            self.put(data)
+            return
+        for term, definition, source in rows():
+            self.put(edomXML(term, definition, source))
+
+    def put(self, text):
+        if not isinstance(text, bytes):
+            text = text.encode('utf-8')
+        self.f.write(text)
+
+def writeMetadata(root, path, streams=None):
+    """Writes a metadata document to path as UTF-8, with any streamed domains"""
+
+    if streams is None or not streams.sources:
+        ET.ElementTree(root).write(path, encoding='utf-8', xml_declaration=True)
+    else:
+        streams.write(root, path)
@@ -0,0 +1,161 @@
+#-------------------------------------------------------------------------------
+# Name:        ncgmp09_journal.py
+# Purpose:     Checkpoint journal of a metadata run, kept in the output folder.
+#              One line is appended (and flushed) each time a table finishes a
+#              stage: export, update (the template, definitions and domains,
+#              which are applied to the parsed document and written once),
+#              import and render. A run started with --resume reads the
+#              journal of the failed run and skips the work it finished, as
+#              long as the journal was written for the same gdb, template,
+#              definitions and parameters.
+#              XML files are written to a temporary file and renamed over the
+#              old one, so a crash never leaves half a file behind.
+#
+# Author:      ethoms
+#
+# Created:     17/10/2026
+# Copyright:   no copyright
+# Licence:     Creative Commons
+#-------------------------------------------------------------------------------
+#!/usr/bin/env python
+
+import os
+import sys
+import glob
+import json
+import threading
+
+#name of the journal file kept in the output folder
+journalName = 'ncgmp09_journal.jsonl'
+
+#end of the names of the temporary files written before they are renamed
+tempSuffix = '.tmp.xml'
+
+def tempPath(path):
+    """The temporary file path is written to before it is renamed, one per process"""
+
+    return '%s.%d%s' % (os.path.splitext(path)[0], os.getpid(), tempSuffix)
+
+#MoveFileExW flags: replace the target if it exists, return once the move is on disk
+MOVEFILE_REPLACE_EXISTING = 0x1
+MOVEFILE_WRITE_THROUGH = 0x8
+
+def replaceFile(tmpPath, path):
+    """Renames tmpPath over path in one step, so path is always either the old file or
+       the new one. os.rename will not rename over an existing file on Windows, where
+       MoveFileExW is called instead (os.replace does the same on Python 3)"""
+
+    if hasattr(os, 'replace'):
+        os.replace(tmpPath, path)
+    elif os.name == 'nt':
+        import ctypes
+        encoding = sys.getfilesystemencoding()
+        source = tmpPath.decode(encoding) if isinstance(tmpPath, bytes) else tmpPath
+        target = path.decode(encoding) if isinstance(path, bytes) else path
+        if not ctypes.windll.kernel32.MoveFileExW(source, target, MOVEFILE_REPLACE_EXISTING | MOVEFILE_WRITE_THROUGH):
+            raise ctypes.WinError()
+    else:
+        os.rename(tmpPath, path)
+
+#the stages of a table in the order they run; when a stage is done again the
+#stages after it have to be done again too
+stageOrder = ['export', 'update', 'import', 'render']
+
+class Checkpoints(object):
+    """The (table, stage) items finished"""
+
+    def __init__(self, finished=()):
+        self.finished = set(finished)
+
+    def isDone(self, table, stage):
+        return (table, stage) in self.finished
+
+    def record(self, table, stage):
+        """Adds a finished stage, forgetting the later stages of the table"""
+
+        if stage in stageOrder:
+            for later in stageOrder[stageOrder.index(stage) + 1:]:
+                self.finished.discard((table, later))
+        self.finished.add((table, stage))
+
+    def done(self, table, stage):
+        self.record(table, stage)
+
+class WorkerCheckpoints(Checkpoints):
+    """The checkpoints of a worker process: those of the run being resumed, sent by the
+       parent process, and the stages finished in the worker, sent back to be journaled"""
+
+    def __init__(self, finished=()):
+        Checkpoints.__init__(self, finished)
+        self.new = []
+
+    def done(self, table, stage):
+        self.record(table, stage)
+        self.new.append((table, stage))
+
+class Journal(Checkpoints):
+    """The checkpoints of a run, appended to the journal file as each stage finishes.
+       Stages are recorded by the main process and the pipeline threads as they finish,
+       the stages of worker processes when their results come back"""
+
+    def __init__(self, outDir, key, resume=False):
+        Checkpoints.__init__(self)
+        self.path = os.path.join(outDir, journalName)
+        self.key = key
+        self.resumed = False
+        self.lock = threading.Lock()
+
+        #temporary files of a run that did not finish
+        for leftover in glob.glob(os.path.join(outDir, '*' + tempSuffix)):
+            os.remove(leftover)
+
+        endsLine = True
+        if resume and os.path.exists(self.path):
+            endsLine = self.load()
+        if self.resumed:
+            self.f = open(self.path, 'a')
+            if not endsLine:
+                #the last line was cut off by the crash
+                self.f.write('\n')
+        else:
+            self.f = open(self.path, 'w')
+            self.write({'key': key})
+
+    def load(self):
+        """Reads the checkpoints of the journal if it was written for the same inputs.
+           Returns False if the last line is incomplete"""
+
+        with open(self.path) as f:
+            text = f.read()
+        lines = text.splitlines()
+        try:
+            if not lines or json.loads(lines[0]).get('key') != self.key:
+                return True
+        except ValueError:
+            return True
+        for line in lines[1:]:
+            try:
+                item = json.loads(line)
+            except ValueError:
+                continue
+            self.record(item['table'], item['stage'])
+        self.resumed = True
+        return text.endswith('\n')
+
+    def write(self, item):
+        self.f.write(json.dumps(item) + '\n')
+        self.f.flush()
+
+    def done(self, table, stage):
+        with self.lock:
+            self.record(table, stage)
+            self.write({'table': table, 'stage': stage})
+
+    def finish(self):
+        """Closes and removes the journal of a run that finished, there is nothing left to resume"""
+
+        self.f.close()
+        os.remove(self.path)
+
+    def close(self):
+        self.f.close()
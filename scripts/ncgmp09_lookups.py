@@ -0,0 +1,154 @@
+#-------------------------------------------------------------------------------
+# Name:        ncgmp09_lookups.py
+# Purpose:     In-memory lookup indexes of the Glossary, DescriptionOfMapUnits
+#              and DataSources tables of an NCGMP09 geodatabase.
+#              Each table is read with a single cursor the first time it is
+#              needed so that domain values can be resolved without a database
+#              query per term. Tables are read through a data-access backend,
+#              arcpy by default.
+#
+# Author:      ethoms
+#
+# Created:     17/10/2026, from the Glossary, DMU and DataSources queries of ncgmp09_update_md.py
+#              (17/04/2015)
+# Copyright:   no copyright
+# Licence:     Creative Commons
+#-------------------------------------------------------------------------------
+#!/usr/bin/env python
+
+from ncgmp09_backends import defaultBackend
+
+def readIndex(table, keyField, valueFields, backend):
+    """Reads a table once and returns a dictionary of {key: [values]} items.
+       Rows with an empty key are skipped and, as with the WHERE clause queries
+       this replaces, only the first row found for a key is kept"""
+
+    index = {}
+    if not backend.exists(table):
+        return index
+
+    for row in backend.rows(table, [keyField] + valueFields):
+        key = row[0]
+        if key is None or key == "":
+            continue
+        if not key in index:
+            index[key] = list(row[1:])
+    return index
+
+class LookupIndex(object):
+    """Term:(definition, source) lookups for the controlled fields of a geodatabase.
+       Glossary            Term -> (Definition, DefinitionSourceID)
+       DescriptionOfMapUnits  MapUnit -> (FullName, DescriptionSourceID)
+       DataSources         DataSources_ID -> Source"""
+
+    def __init__(self, glossary, dmu, dataSources, backend=None):
+        self.backend = backend or defaultBackend()
+        self.glossaryPath = glossary
+        self.dmuPath = dmu
+        self.sourcesPath = dataSources
+        self._glossary = None
+        self._dmu = None
+        self._sources = None
+        #(field, term): [definition, source] or None, each term is resolved once per run
+        self._resolved = {}
+
+    def refresh(self):
+        """Forgets the tables read and the terms resolved, they are read again when next
+           asked for. Used when the geodatabase has been edited"""
+
+        self._glossary = None
+        self._dmu = None
+        self._sources = None
+        self._resolved = {}
+
+    def load(self):
+        """Reads all three tables now rather than the first time each is asked for"""
+
+        self.glossary
+        self.dmu
+        self.sources
+
+    #each table is only read the first time it is asked for
+    @property
+    def glossary(self):
+        if self._glossary is None:
+            self._glossary = readIndex(self.glossaryPath, 'Term', ['Definition', 'DefinitionSourceID'], self.backend)
+        return self._glossary
+
+    @property
+    def dmu(self):
+        if self._dmu is None:
+            self._dmu = readIndex(self.dmuPath, 'MapUnit', ['FullName', 'DescriptionSourceID'], self.backend)
+        return self._dmu
+
+    @property
+    def sources(self):
+        if self._sources is None:
+            self._sources = dict((k, v[0]) for k, v in readIndex(self.sourcesPath, 'DataSources_ID', ['Source'], self.backend).items())
+        return self._sources
+
+    def sourceRef(self, sourceID):
+        """Returns the source reference for a DataSources_ID or an empty string"""
+        return self.sources.get(sourceID, "")
+
+    def resolve(self, fld, term, memo=True):
+        """Returns [definition, source] for a term found in a controlled field or
+           None if the term cannot be found. The answer is kept for the rest of the run
+           because the same fields and terms turn up in many tables, unless memo is False"""
+
+        if not memo:
+            return self.lookup(fld, term)
+        key = (fld, term)
+        if not key in self._resolved:
+            self._resolved[key] = self.lookup(fld, term)
+        return self._resolved[key]
+
+    def lookup(self, fld, term):
+        """Looks a term up in the indexes.
+           Map Units are a special case because their definition is not in the Glossary but the DMU
+           and DataSourceIDs are defined by the DataSources table itself"""
+
+        if fld == 'MapUnit':
+            row = self.dmu.get(term)
+            if row is None:
+                return None
+            return [row[0], self.sourceRef(row[1])]
+        elif fld == 'DataSourceID':
+            if not term in self.sources:
+                return None
+            return [self.sources[term], 'This study']
+        else:
+            row = self.glossary.get(term)
+            if row is None:
+                return None
+            return [row[0], self.sourceRef(row[1])]
+
+    def resolveTerms(self, fld, terms):
+        """Resolves a list of terms for a field.
+           Returns a dictionary of term:[definition, source] items and a list of the
+           terms that could not be found"""
+
+        defs = {}
+        cantfind = []
+        for term in terms:
+            match = self.resolve(fld, term)
+            if match is None:
+                cantfind.append(term)
+            else:
+                defs[term] = match
+        return defs, cantfind
+
+    def missingTerms(self, fld, terms):
+        """Returns the terms of a field that cannot be found, without building any definitions
+           or keeping the answers, for streamed domains"""
+
+        return [term for term in terms if self.resolve(fld, term, memo=False) is None]
+
+    def iterDefinitions(self, fld, terms):
+        """Yields (term, definition, source) for each term that can be found, in the order
+           of terms. Nothing is kept, so a sorted list of terms streams its domain"""
+
+        for term in terms:
+            match = self.resolve(fld, term, memo=False)
+            if match is not None:
+                yield term, match[0], match[1]
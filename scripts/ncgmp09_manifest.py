@@ -0,0 +1,71 @@
+#-------------------------------------------------------------------------------
+# Name:        ncgmp09_manifest.py
+# Purpose:     Content-hash manifest for incremental runs of ncgmp09_update_md.py.
+#              Records, for every table, a hash of everything its metadata is
+#              built from (the template, the entity definitions, the controlled
+#              field terms of the table and their Glossary/DataSources/DMU
+#              definitions) so unchanged tables can be skipped on the next run.
+#
+# Author:      ethoms
+#
+# Created:     17/10/2026
+# Copyright:   no copyright
+# Licence:     Creative Commons
+#-------------------------------------------------------------------------------
+#!/usr/bin/env python
+
+import os
+import json
+import hashlib
+
+#name of the manifest file kept in the output folder
+manifestName = 'ncgmp09_manifest.json'
+
+def fileHash(path):
+    """Returns the SHA-1 of the contents of a file, or an empty string if there is no file"""
+
+    if not path or not os.path.exists(path):
+        return ''
+    sha = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+def dataHash(data):
+    """Returns the SHA-1 of any JSON-serializable data. Dictionary keys are sorted so
+       equal data always hashes the same"""
+
+    text = json.dumps(data, sort_keys=True, default=repr)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+class Manifest(object):
+    """{table name: input hash} of the last run that wrote an output folder"""
+
+    def __init__(self, outDir):
+        self.path = os.path.join(outDir, manifestName)
+        self.tables = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path) as f:
+                    self.tables = json.load(f).get('tables', {})
+            except ValueError:
+                #a damaged manifest only means everything is rebuilt
+                self.tables = {}
+
+    def isCurrent(self, table, signature, xmlPath):
+        """True if the table was built from the same inputs and its XML file is still there"""
+        return self.tables.get(table) == signature and os.path.exists(xmlPath)
+
+    def update(self, table, signature):
+        self.tables[table] = signature
+
+    def prune(self, names):
+        """Forgets the tables that are no longer in the geodatabase"""
+        for table in list(self.tables):
+            if not table in names:
+                del self.tables[table]
+
+    def save(self):
+        with open(self.path, 'w') as f:
+            json.dump({'tables': self.tables}, f, indent=1, sort_keys=True)
@@ -0,0 +1,128 @@
+#-------------------------------------------------------------------------------
+# Name:        ncgmp09_mp.py
+# Purpose:     Runs the USGS metadata parser (mp) on a list of FGDC XML files,
+#              producing all of the requested outputs for every file.
+#              The mp invocations run concurrently in a bounded pool of
+#              threads, each waiting on its own mp process, and the exit code
+#              and stderr of every invocation are collected for reporting.
+#
+# Author:      ethoms
+#
+# Created:     17/10/2026, from the mp calls of ncgmp09_update_md.py
+#              (17/04/2015)
+# Copyright:   no copyright
+# Licence:     Creative Commons
+#-------------------------------------------------------------------------------
+#!/usr/bin/env python
+
+import os
+import sys
+import time
+import threading
+import subprocess
+import multiprocessing
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+#output format: (mp switch, suffix of the output file)
+mpFormats = {'ERR': ('-e', '_err.txt'),
+             'TXT': ('-t', '_meta.txt'),
+             'HTML': ('-h', '_meta.html'),
+             'FAQ': ('-f', '_faq.html')}
+
+#the order the outputs of a file are asked for
+formatOrder = ['ERR', 'TXT', 'HTML', 'FAQ']
+
+class MPResult(object):
+    """The outcome of one mp invocation"""
+
+    def __init__(self, xml, outFormat, outPath):
+        self.xml = xml
+        self.format = outFormat
+        self.outPath = outPath
+        self.returncode = None
+        self.stderr = ''
+        self.seconds = 0.0
+
+    @property
+    def ok(self):
+        return self.returncode == 0
+
+def mpCommand(mp):
+    """Returns the command list that starts mp. A .py stand-in for mp.exe
+       is run with the current interpreter"""
+
+    if mp.lower().endswith('.py'):
+        return [sys.executable, mp]
+    return [mp]
+
+def mpJobs(xmlList, outDir, formats):
+    """Returns an MPResult to be filled in for every (file, format) pair"""
+
+    jobs = []
+    for f in xmlList:
+        fName = os.path.splitext(os.path.basename(f))[0]
+        for outFormat in formatOrder:
+            if outFormat in formats:
+                outPath = os.path.join(outDir, fName + mpFormats[outFormat][1])
+                jobs.append(MPResult(f, outFormat, outPath))
+    return jobs
+
+def runJob(command, job):
+    """Runs mp for one job and records the exit code and stderr"""
+
+    start = time.time()
+    try:
+        proc = subprocess.Popen(command + [mpFormats[job.format][0], job.outPath, job.xml],
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        out, err = proc.communicate()
+        job.returncode = proc.returncode
+        job.stderr = err.decode('utf-8', 'replace').strip() if err else ''
+    except OSError as e:
+        #mp could not be started at all
+        job.returncode = -1
+        job.stderr = str(e)
+    job.seconds = time.time() - start
+
+def runMP(mp, xmlList, outDir, formats, workers=0):
+    """Runs mp for each file in xmlList and each of the formats ('ERR', 'TXT',
+       'HTML', 'FAQ') with at most workers mp processes at a time (0 for one per CPU).
+       Returns the list of MPResults and the total wall time in seconds"""
+
+    if workers < 1:
+        workers = multiprocessing.cpu_count()
+    command = mpCommand(mp)
+    jobs = mpJobs(xmlList, outDir, formats)
+
+    todo = queue.Queue()
+    for job in jobs:
+        todo.put(job)
+
+    def worker():
+        while True:
+            try:
+                job = todo.get_nowait()
+            except queue.Empty:
+                return
+            runJob(command, job)
+
+    start = time.time()
+    threads = [threading.Thread(target=worker) for i in range(min(workers, len(jobs)))]
+    for t in threads:
+        t.daemon = True
+        t.start()
+    for t in threads:
+        t.join()
+    return jobs, time.time() - start
+
+def reportMP(results, seconds, pPrint):
+    """Prints a summary of an mp run, listing every invocation that failed"""
+
+    failed = [r for r in results if not r.ok]
+    pPrint('mp ran %d times on %d files in %.2f s' % (len(results), len(set(r.xml for r in results)), seconds))
+    for r in failed:
+        pPrint('\tmp %s failed for %s (exit code %s)' % (mpFormats[r.format][0], r.xml, r.returncode))
+        if r.stderr:
+            pPrint('\t\t%s' % r.stderr)
@@ -0,0 +1,100 @@
+#-------------------------------------------------------------------------------
+# Name:        ncgmp09_pipeline.py
+# Purpose:     Runs a list of items through a chain of stages with one thread
+#              per stage and a queue between each pair of stages, so that a
+#              stage works on an item as soon as the stage before it is done
+#              with it. Used to overlap the ArcGIS export and import of the
+#              metadata with the XML transformation: while ArcGIS exports one
+#              table the domains of the previous one are being built, and the
+#              total wall time tends to the time of the slowest stage rather
+#              than the sum of all of them.
+#
+# Author:      ethoms
+#
+# Created:     17/10/2026
+# Copyright:   no copyright
+# Licence:     Creative Commons
+#-------------------------------------------------------------------------------
+#!/usr/bin/env python
+
+import time
+import threading
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+#put in a queue after the last item
+end = object()
+
+class Stage(object):
+    """One stage of a pipeline: a function called on each item, and the time spent
+       working and waiting for items"""
+
+    def __init__(self, name, function):
+        self.name = name
+        self.function = function
+        self.items = 0
+        self.busy = 0.0
+        self.waiting = 0.0
+
+def runStage(stage, inbox, outbox, failures):
+    """The thread of one stage: takes items from inbox until the end marker, passing the
+       result of the stage's function for each one to outbox. Stops at the first failure
+       of any stage"""
+
+    while True:
+        start = time.time()
+        item = inbox.get()
+        stage.waiting += time.time() - start
+        if item is end or failures:
+            outbox.put(end)
+            return
+        start = time.time()
+        try:
+            result = stage.function(item)
+        except Exception as e:
+            failures.append(e)
+            outbox.put(end)
+            return
+        stage.busy += time.time() - start
+        stage.items += 1
+        outbox.put(result)
+
+def runPipeline(items, stages):
+    """Passes each item through stages, a list of Stages, each in its own thread.
+       Returns the results of the last stage, in the order of items, and the wall time
+       in seconds. The first exception raised by a stage stops the pipeline and is
+       raised again once every thread has stopped"""
+
+    queues = [queue.Queue() for i in range(len(stages) + 1)]
+    failures = []
+    threads = [threading.Thread(target=runStage, args=(stage, queues[i], queues[i + 1], failures))
+               for i, stage in enumerate(stages)]
+
+    start = time.time()
+    for t in threads:
+        t.daemon = True
+        t.start()
+    for item in items:
+        queues[0].put(item)
+    queues[0].put(end)
+
+    results = []
+    while True:
+        result = queues[-1].get()
+        if result is end:
+            break
+        results.append(result)
+    for t in threads:
+        t.join()
+    if failures:
+        raise failures[0]
+    return results, time.time() - start
+
+def reportPipeline(stages, seconds, pPrint):
+    """Prints the wall time of a pipeline run and the time each stage spent working and waiting"""
+
+    pPrint('Pipeline ran in %.2f s' % seconds)
+    for stage in stages:
+        pPrint('\t%-12s %4d items, busy %8.2f s, waiting %8.2f s' % (stage.name, stage.items, stage.busy, stage.waiting))
@@ -0,0 +1,286 @@
+#-------------------------------------------------------------------------------
+# Name:        ncgmp09_render.py
+# Purpose:     In-process renderer for the text, HTML and FAQ versions of FGDC
+#              CSDGM metadata, the outputs mp -t, -h and -f write.
+#              Each document is parsed once and every requested output (and the
+#              structural validation report) is written from that one tree.
+#              The outputs are streamed to their files element by element as the
+#              tree is walked and the files are shared out to a pool of worker
+#              processes, so it runs on Linux and needs no mp.exe.
+#
+# Author:      ethoms
+#
+# Created:     17/10/2026
+# Copyright:   no copyright
+# Licence:     Creative Commons
+#-------------------------------------------------------------------------------
+#!/usr/bin/env python
+
+import io
+import os
+import time
+import multiprocessing
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape
+from ncgmp09_validate import validate
+#the outputs are named as mp names them and written in the same order
+from ncgmp09_mp import mpFormats, formatOrder
+
+#CSDGM element tag: long name used as the label in the outputs
+longNames = {
+    'metadata': 'Metadata',
+    'idinfo': 'Identification_Information', 'citation': 'Citation', 'citeinfo': 'Citation_Information',
+    'origin': 'Originator', 'pubdate': 'Publication_Date', 'pubtime': 'Publication_Time', 'title': 'Title',
+    'edition': 'Edition', 'geoform': 'Geospatial_Data_Presentation_Form', 'serinfo': 'Series_Information',
+    'sername': 'Series_Name', 'issue': 'Issue_Identification', 'pubinfo': 'Publication_Information',
+    'pubplace': 'Publication_Place', 'publish': 'Publisher', 'othercit': 'Other_Citation_Details',
+    'onlink': 'Online_Linkage', 'lworkcit': 'Larger_Work_Citation',
+    'descript': 'Description', 'abstract': 'Abstract', 'purpose': 'Purpose', 'supplinf': 'Supplemental_Information',
+    'timeperd': 'Time_Period_of_Content', 'timeinfo': 'Time_Period_Information', 'sngdate': 'Single_Date/Time',
+    'mdattim': 'Multiple_Dates/Times', 'rngdates': 'Range_of_Dates/Times', 'begdate': 'Beginning_Date',
+    'begtime': 'Beginning_Time', 'enddate': 'Ending_Date', 'endtime': 'Ending_Time', 'caldate': 'Calendar_Date',
+    'time': 'Time_of_Day', 'current': 'Currentness_Reference',
+    'status': 'Status', 'progress': 'Progress', 'update': 'Maintenance_and_Update_Frequency',
+    'spdom': 'Spatial_Domain', 'bounding': 'Bounding_Coordinates', 'westbc': 'West_Bounding_Coordinate',
+    'eastbc': 'East_Bounding_Coordinate', 'northbc': 'North_Bounding_Coordinate',
+    'southbc': 'South_Bounding_Coordinate',
+    'keywords': 'Keywords', 'theme': 'Theme', 'themekt': 'Theme_Keyword_Thesaurus', 'themekey': 'Theme_Keyword',
+    'place': 'Place', 'placekt': 'Place_Keyword_Thesaurus', 'placekey': 'Place_Keyword',
+    'stratum': 'Stratum', 'stratkt': 'Stratum_Keyword_Thesaurus', 'stratkey': 'Stratum_Keyword',
+    'temporal': 'Temporal', 'tempkt': 'Temporal_Keyword_Thesaurus', 'tempkey': 'Temporal_Keyword',
+    'accconst': 'Access_Constraints', 'useconst': 'Use_Constraints', 'ptcontac': 'Point_of_Contact',
+    'browse': 'Browse_Graphic', 'browsen': 'Browse_Graphic_File_Name', 'browsed': 'Browse_Graphic_File_Description',
+    'browset': 'Browse_Graphic_File_Type', 'datacred': 'Data_Set_Credit', 'secinfo': 'Security_Information',
+    'native': 'Native_Data_Set_Environment', 'crossref': 'Cross_Reference',
+    'cntinfo': 'Contact_Information', 'cntperp': 'Contact_Person_Primary', 'cntorgp': 'Contact_Organization_Primary',
+    'cntper': 'Contact_Person', 'cntorg': 'Contact_Organization', 'cntpos': 'Contact_Position',
+    'cntaddr': 'Contact_Address', 'addrtype': 'Address_Type', 'address': 'Address', 'city': 'City',
+    'state': 'State_or_Province', 'postal': 'Postal_Code', 'country': 'Country',
+    'cntvoice': 'Contact_Voice_Telephone', 'cntfax': 'Contact_Facsimile_Telephone',
+    'cntemail': 'Contact_Electronic_Mail_Address', 'hours': 'Hours_of_Service', 'cntinst': 'Contact_Instructions',
+    'dataqual': 'Data_Quality_Information', 'attracc': 'Attribute_Accuracy',
+    'attraccr': 'Attribute_Accuracy_Report', 'logic': 'Logical_Consistency_Report',
+    'complete': 'Completeness_Report', 'posacc': 'Positional_Accuracy', 'horizpa': 'Horizontal_Positional_Accuracy',
+    'horizpar': 'Horizontal_Positional_Accuracy_Report', 'vertacc': 'Vertical_Positional_Accuracy',
+    'vertaccr': 'Vertical_Positional_Accuracy_Report', 'lineage': 'Lineage', 'srcinfo': 'Source_Information',
+    'srccite': 'Source_Citation', 'srcscale': 'Source_Scale_Denominator', 'typesrc': 'Type_of_Source_Media',
+    'srctime': 'Source_Time_Period_of_Content', 'srccurr': 'Source_Currentness_Reference',
+    'srccitea': 'Source_Citation_Abbreviation', 'srccontr': 'Source_Contribution',
+    'procstep': 'Process_Step', 'procdesc': 'Process_Description', 'procdate': 'Process_Date',
+    'proccont': 'Process_Contact', 'srcused': 'Source_Used_Citation_Abbreviation',
+    'srcprod': 'Source_Produced_Citation_Abbreviation', 'cloud': 'Cloud_Cover',
+    'spdoinfo': 'Spatial_Data_Organization_Information', 'indspref': 'Indirect_Spatial_Reference',
+    'direct': 'Direct_Spatial_Reference_Method', 'ptvctinf': 'Point_and_Vector_Object_Information',
+    'sdtsterm': 'SDTS_Terms_Description', 'sdtstype': 'SDTS_Point_and_Vector_Object_Type',
+    'ptvctcnt': 'Point_and_Vector_Object_Count',
+    'spref': 'Spatial_Reference_Information', 'horizsys': 'Horizontal_Coordinate_System_Definition',
+    'geograph': 'Geographic', 'latres': 'Latitude_Resolution', 'longres': 'Longitude_Resolution',
+    'geogunit': 'Geographic_Coordinate_Units', 'planar': 'Planar', 'mapproj': 'Map_Projection',
+    'mapprojn': 'Map_Projection_Name', 'gridsys': 'Grid_Coordinate_System',
+    'gridsysn': 'Grid_Coordinate_System_Name', 'utm': 'Universal_Transverse_Mercator',
+    'utmzone': 'UTM_Zone_Number', 'transmer': 'Transverse_Mercator', 'sfctrmer': 'Scale_Factor_at_Central_Meridian',
+    'longcm': 'Longitude_of_Central_Meridian', 'latprjo': 'Latitude_of_Projection_Origin',
+    'feast': 'False_Easting', 'fnorth': 'False_Northing', 'planci': 'Planar_Coordinate_Information',
+    'plance': 'Planar_Coordinate_Encoding_Method', 'coordrep': 'Coordinate_Representation',
+    'absres': 'Abscissa_Resolution', 'ordres': 'Ordinate_Resolution', 'plandu': 'Planar_Distance_Units',
+    'geodetic': 'Geodetic_Model', 'horizdn': 'Horizontal_Datum_Name', 'ellips': 'Ellipsoid_Name',
+    'semiaxis': 'Semi-major_Axis', 'denflat': 'Denominator_of_Flattening_Ratio',
+    'eainfo': 'Entity_and_Attribute_Information', 'detailed': 'Detailed_Description',
+    'enttyp': 'Entity_Type', 'enttypl': 'Entity_Type_Label', 'enttypd': 'Entity_Type_Definition',
+    'enttypds': 'Entity_Type_Definition_Source', 'attr': 'Attribute', 'attrlabl': 'Attribute_Label',
+    'attrdef': 'Attribute_Definition', 'attrdefs': 'Attribute_Definition_Source',
+    'attrdomv': 'Attribute_Domain_Values', 'edom': 'Enumerated_Domain', 'edomv': 'Enumerated_Domain_Value',
+    'edomvd': 'Enumerated_Domain_Value_Definition', 'edomvds': 'Enumerated_Domain_Value_Definition_Source',
+    'rdom': 'Range_Domain', 'rdommin': 'Range_Domain_Minimum', 'rdommax': 'Range_Domain_Maximum',
+    'attrunit': 'Attribute_Units_of_Measure', 'attrmres': 'Attribute_Measurement_Resolution',
+    'codesetd': 'Codeset_Domain', 'codesetn': 'Codeset_Name', 'codesets': 'Codeset_Source',
+    'udom': 'Unrepresentable_Domain', 'begdatea': 'Beginning_Date_of_Attribute_Values',
+    'enddatea': 'Ending_Date_of_Attribute_Values', 'attrvai': 'Attribute_Value_Accuracy_Information',
+    'attrmfrq': 'Attribute_Measurement_Frequency', 'overview': 'Overview_Description',
+    'eaover': 'Entity_and_Attribute_Overview', 'eadetcit': 'Entity_and_Attribute_Detail_Citation',
+    'distinfo': 'Distribution_Information', 'distrib': 'Distributor', 'resdesc': 'Resource_Description',
+    'distliab': 'Distribution_Liability', 'stdorder': 'Standard_Order_Process',
+    'nondig': 'Non-digital_Form', 'digform': 'Digital_Form', 'digtinfo': 'Digital_Transfer_Information',
+    'formname': 'Format_Name', 'digtopt': 'Digital_Transfer_Option', 'onlinopt': 'Online_Option',
+    'computer': 'Computer_Contact_Information', 'networka': 'Network_Address', 'networkr': 'Network_Resource_Name',
+    'fees': 'Fees', 'ordering': 'Ordering_Instructions', 'custom': 'Custom_Order_Process',
+    'techpreq': 'Technical_Prerequisites', 'availabl': 'Available_Time_Period',
+    'metainfo': 'Metadata_Reference_Information', 'metd': 'Metadata_Date', 'metrd': 'Metadata_Review_Date',
+    'metfrd': 'Metadata_Future_Review_Date', 'metc': 'Metadata_Contact',
+    'metstdn': 'Metadata_Standard_Name', 'metstdv': 'Metadata_Standard_Version',
+    'mettc': 'Metadata_Time_Convention', 'metac': 'Metadata_Access_Constraints',
+    'metuc': 'Metadata_Use_Constraints', 'metsi': 'Metadata_Security_Information',
+    'metextns': 'Metadata_Extensions', 'metprof': 'Profile_Name',
+}
+
+#FAQ question: paths of the elements that answer it
+faqQuestions = [
+    ('What does this data set describe?', ['idinfo/citation/citeinfo/title', 'idinfo/descript/abstract',
+                                           'idinfo/descript/supplinf', 'idinfo/timeperd', 'idinfo/spdom',
+                                           'idinfo/keywords', 'eainfo']),
+    ('Who produced the data set?', ['idinfo/citation/citeinfo/origin', 'idinfo/ptcontac', 'idinfo/datacred']),
+    ('Why was the data set created?', ['idinfo/descript/purpose']),
+    ('How was the data set created?', ['dataqual/lineage']),
+    ('How reliable are the data; what problems remain in the data set?',
+     ['dataqual/attracc', 'dataqual/logic', 'dataqual/complete', 'dataqual/posacc', 'dataqual/cloud']),
+    ('How can someone get a copy of the data set?', ['idinfo/accconst', 'idinfo/useconst', 'distinfo']),
+    ('Who wrote the metadata?', ['metainfo']),
+]
+
+def longName(tag):
+    return longNames.get(tag, tag)
+
+def textOf(value):
+    """Element text as unicode, stripped"""
+
+    if value is None:
+        return u''
+    if not isinstance(value, u''.__class__):
+        value = value.decode('utf-8')
+    return value.strip()
+
+def writeText(out, elem, depth=0):
+    """Writes an element and its children as indented 'Long_Name: value' lines, as mp -t does.
+       Values of more than one line go on the lines below their label"""
+
+    indent = u'  ' * depth
+    value = textOf(elem.text)
+    if '\n' in value:
+        out.write(u'%s%s:\n' % (indent, longName(elem.tag)))
+        for line in value.split('\n'):
+            out.write(u'%s  %s\n' % (indent, line.strip()))
+    elif value:
+        out.write(u'%s%s: %s\n' % (indent, longName(elem.tag), value))
+    else:
+        out.write(u'%s%s:\n' % (indent, longName(elem.tag)))
+    for child in elem:
+        if isinstance(child.tag, str):
+            writeText(out, child, depth + 1)
+
+def writeHTMLItem(out, elem):
+    """Writes an element as a definition list item, its children in a nested list"""
+
+    value = textOf(elem.text)
+    children = [child for child in elem if isinstance(child.tag, str)]
+    if value:
+        value = escape(value).replace(u'\n', u'<br>\n')
+        out.write(u'<dt><em>%s:</em> %s</dt>\n' % (longName(elem.tag), value))
+    else:
+        out.write(u'<dt><em>%s:</em></dt>\n' % longName(elem.tag))
+    if children:
+        out.write(u'<dd>\n<dl>\n')
+        for child in children:
+            writeHTMLItem(out, child)
+        out.write(u'</dl>\n</dd>\n')
+
+def documentTitle(root):
+    title = root.find('idinfo/citation/citeinfo/title')
+    if title is None:
+        return u'Metadata'
+    return escape(textOf(title.text))
+
+def writeHTML(out, root):
+    """Writes the document as nested definition lists, as mp -h does"""
+
+    out.write(u'<html>\n<head>\n<meta http-equiv="Content-Type" content="text/html; charset=utf-8">\n')
+    out.write(u'<title>%s</title>\n</head>\n<body>\n<h1>%s</h1>\n<dl>\n' % (documentTitle(root), documentTitle(root)))
+    for child in root:
+        if isinstance(child.tag, str):
+            writeHTMLItem(out, child)
+    out.write(u'</dl>\n</body>\n</html>\n')
+
+def writeFAQ(out, root):
+    """Writes the document as answers to the questions mp -f asks, each answered
+       with the elements of the document that describe it"""
+
+    out.write(u'<html>\n<head>\n<meta http-equiv="Content-Type" content="text/html; charset=utf-8">\n')
+    out.write(u'<title>%s</title>\n</head>\n<body>\n<h1>%s</h1>\n' % (documentTitle(root), documentTitle(root)))
+    out.write(u'<h2>Frequently-anticipated questions:</h2>\n<ul>\n')
+    for i, (question, paths) in enumerate(faqQuestions):
+        out.write(u'<li><a href="#what%d">%s</a></li>\n' % (i + 1, question))
+    out.write(u'</ul>\n')
+    for i, (question, paths) in enumerate(faqQuestions):
+        out.write(u'<h3><a name="what%d">%d. %s</a></h3>\n<dl>\n' % (i + 1, i + 1, question))
+        found = False
+        for path in paths:
+            for elem in root.findall(path):
+                writeHTMLItem(out, elem)
+                found = True
+        if not found:
+            out.write(u'<dt>This information is not given in the metadata.</dt>\n')
+        out.write(u'</dl>\n')
+    out.write(u'</body>\n</html>\n')
+
+def outputPaths(xml, outDir, formats):
+    """Returns (format, output path) pairs for a file, in formatOrder"""
+
+    fName = os.path.splitext(os.path.basename(xml))[0]
+    return [(outFormat, os.path.join(outDir, fName + mpFormats[outFormat][1]))
+            for outFormat in formatOrder if outFormat in formats]
+
+def renderFile(job):
+    """Parses one XML file and writes each requested output from the tree.
+       job is (XML path, output folder, formats).
+       Returns (XML path, number of validation errors or None, error message or None,
+       seconds taken)"""
+
+    xml, outDir, formats = job
+    start = time.time()
+    try:
+        root = ET.parse(xml).getroot()
+    except (ET.ParseError, IOError) as e:
+        return xml, None, 'could not be read as XML: %s' % e, time.time() - start
+
+    errors = None
+    try:
+        for outFormat, outPath in outputPaths(xml, outDir, formats):
+            with io.open(outPath, 'w', encoding='utf-8') as out:
+                if outFormat == 'ERR':
+                    report = validate(root)
+                    errors = report.errors
+                    out.write(textOf(report.text()) + u'\n')
+                elif outFormat == 'TXT':
+                    writeText(out, root)
+                elif outFormat == 'HTML':
+                    writeHTML(out, root)
+                elif outFormat == 'FAQ':
+                    writeFAQ(out, root)
+    except (IOError, OSError) as e:
+        #eg, a read-only folder or an output locked by another program on Windows
+        return xml, errors, 'could not be written: %s' % e, time.time() - start
+    return xml, errors, None, time.time() - start
+
+def renderFiles(xmlList, outDir, formats, workers=0):
+    """Writes the requested outputs ('ERR', 'TXT', 'HTML', 'FAQ') of every file in xmlList
+       to outDir, with the files shared out to a pool of worker processes (0 for one per CPU).
+       Returns the list of renderFile results and the wall time in seconds"""
+
+    jobs = [(f, outDir, formats) for f in xmlList]
+    if workers < 1:
+        workers = multiprocessing.cpu_count()
+    workers = min(workers, len(jobs))
+
+    start = time.time()
+    if workers <= 1:
+        results = [renderFile(job) for job in jobs]
+    else:
+        pool = multiprocessing.Pool(workers)
+        try:
+            results = pool.map(renderFile, jobs)
+            pool.close()
+        except:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+    return results, time.time() - start
+
+def reportRender(results, seconds, pPrint):
+    """Prints a summary of a render run, listing files that could not be read or did not validate"""
+
+    pPrint('Rendered %d files in %.2f s' % (len(results), seconds))
+    for xml, errors, failure, fileSeconds in results:
+        if failure:
+            pPrint('\t%s %s' % (os.path.basename(xml), failure))
+        elif errors:
+            pPrint('\t%s: %d validation errors' % (os.path.basename(xml), errors))
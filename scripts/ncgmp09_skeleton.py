@@ -0,0 +1,241 @@
+#-------------------------------------------------------------------------------
+# Name:        ncgmp09_skeleton.py
+# Purpose:     Builds the FGDC CSDGM skeleton of a table or feature class
+#              straight from its catalog snapshot, as an alternative to
+#              arcpy.ExportMetadata_conversion with the ARCGIS2FGDC.xml
+#              translator. The eainfo entity and attribute list comes from the
+#              field schemas, spdoinfo and spref of feature classes from the
+#              shape type and spatial reference; the projection parameters are
+#              read from the well-known text of the spatial reference, and
+#              projections CSDGM has no parameters for are left out for
+#              --export arcgis to describe. The idinfo, dataqual, distinfo
+#              and metainfo sections are filled in by the template and the
+#              entity and attribute definitions by NCGMP09_entity_definitions.xml.
+#
+# Author:      ethoms
+#
+# Created:     17/10/2026
+# Copyright:   no copyright
+# Licence:     Creative Commons
+#-------------------------------------------------------------------------------
+#!/usr/bin/env python
+
+import re
+import time
+import xml.etree.ElementTree as ET
+
+#field type: (attribute definition, unrepresentable domain) of the fields managed by ArcGIS,
+#the text the ArcGIS translator writes for them
+systemFields = {
+    'OID': ('Internal feature number.', 'Sequential unique whole numbers that are automatically generated.'),
+    'Geometry': ('Feature geometry.', 'Coordinates defining the features.'),
+    'GlobalID': ('Globally unique identifier.', 'Unique identifiers that are automatically generated.'),
+}
+
+#names of the fields ArcGIS keeps up to date on feature classes
+shapeFields = {
+    'Shape_Length': ('Length of feature in internal units.', 'Positive real numbers that are automatically generated.'),
+    'Shape_Area': ('Area of feature in internal units squared.', 'Positive real numbers that are automatically generated.'),
+}
+
+#shape type: SDTS point and vector object type
+sdtsTypes = {'Point': 'Entity point', 'Multipoint': 'Entity point', 'Polyline': 'String',
+             'Polygon': 'G-polygon', 'MultiPatch': 'G-polygon'}
+
+#datum names in the Esri spatial reference string (or the EPSG names in a GeoPackage):
+#CSDGM horizontal datum names
+datumNames = {'D_North_American_1983': 'North American Datum of 1983',
+              'D_North_American_1927': 'North American Datum of 1927',
+              'D_WGS_1984': 'D_WGS_1984',
+              'North_American_Datum_1983': 'North American Datum of 1983',
+              'North_American_Datum_1927': 'North American Datum of 1927',
+              'WGS_1984': 'D_WGS_1984'}
+
+datumPattern = re.compile(r'DATUM\["([^"]+)",\s*SPHEROID\["([^"]+)",\s*([-\d.eE+]+),\s*([-\d.eE+]+)\]')
+
+projectionPattern = re.compile(r'PROJECTION\["([^"]+)"')
+parameterPattern = re.compile(r'PARAMETER\["([^"]+)",\s*([-\d.eE+]+)\]')
+utmPattern = re.compile(r'UTM[ _]zone[ _](\d+)([NS]?)', re.I)
+
+#CSDGM parameters of the projections in the Esri and OGC well-known text: each item is
+#the alternatives for one parameter, (CSDGM element, WKT parameter names); stdparll takes
+#every standard parallel found, the other elements the first parameter found
+falseOrigin = [[('feast', ['false_easting'])], [('fnorth', ['false_northing'])]]
+conicParameters = ([[('stdparll', ['standard_parallel_1', 'standard_parallel_2']), ('stdparll', ['latitude_of_origin'])],
+                    [('longcm', ['central_meridian', 'longitude_of_center'])],
+                    [('latprjo', ['latitude_of_origin', 'latitude_of_center'])]] + falseOrigin)
+transverseMercator = ('Transverse Mercator', 'transmer',
+                      [[('sfctrmer', ['scale_factor'])], [('longcm', ['central_meridian'])],
+                       [('latprjo', ['latitude_of_origin'])]] + falseOrigin)
+mercator = ('Mercator', 'mercator',
+            [[('stdparll', ['standard_parallel_1']), ('sfequat', ['scale_factor'])],
+             [('longcm', ['central_meridian'])]] + falseOrigin)
+equirectangular = ('Equirectangular', 'equirect',
+                   [[('stdparll', ['standard_parallel_1'])], [('longcm', ['central_meridian'])]] + falseOrigin)
+
+#WKT projection name (lower case): (CSDGM map projection name, element, parameters)
+projections = {
+    'transverse_mercator': transverseMercator,
+    'albers': ('Albers Conical Equal Area', 'albers', conicParameters),
+    'albers_conic_equal_area': ('Albers Conical Equal Area', 'albers', conicParameters),
+    'lambert_conformal_conic': ('Lambert Conformal Conic', 'lambertc', conicParameters),
+    'lambert_conformal_conic_1sp': ('Lambert Conformal Conic', 'lambertc', conicParameters),
+    'lambert_conformal_conic_2sp': ('Lambert Conformal Conic', 'lambertc', conicParameters),
+    'mercator': mercator,
+    'mercator_1sp': mercator,
+    'mercator_2sp': mercator,
+    'equirectangular': equirectangular,
+    'equidistant_cylindrical': equirectangular,
+}
+
+def textElement(parent, tag, text):
+    elem = ET.SubElement(parent, tag)
+    elem.text = '%s' % text
+    return elem
+
+def attrElement(fld):
+    """The attr element of one FieldSchema"""
+
+    attr = ET.Element('attr')
+    textElement(attr, 'attrlabl', fld.name)
+    definition = systemFields.get(fld.type) or shapeFields.get(fld.name)
+    if definition:
+        textElement(attr, 'attrdef', definition[0])
+        textElement(attr, 'attrdefs', 'Esri')
+        attrdomv = ET.SubElement(attr, 'attrdomv')
+        textElement(attrdomv, 'udom', definition[1])
+    else:
+        textElement(attr, 'attrdef', fld.aliasName or fld.name)
+        textElement(attr, 'attrdefs', 'Producer defined')
+    return attr
+
+def eainfoElement(obj):
+    """The eainfo element of a CatalogObject: an entity with one attr per field"""
+
+    eainfo = ET.Element('eainfo')
+    detailed = ET.SubElement(eainfo, 'detailed')
+    enttyp = ET.SubElement(detailed, 'enttyp')
+    textElement(enttyp, 'enttypl', obj.name)
+    textElement(enttyp, 'enttypd', obj.dataType)
+    textElement(enttyp, 'enttypds', 'Esri')
+    for fld in obj.fields:
+        detailed.append(attrElement(fld))
+    return eainfo
+
+def spdoinfoElement(obj):
+    """The spdoinfo element of a feature class, None for a table"""
+
+    if obj.shapeType is None:
+        return None
+    spdoinfo = ET.Element('spdoinfo')
+    textElement(spdoinfo, 'direct', 'Vector')
+    sdtsterm = ET.SubElement(ET.SubElement(spdoinfo, 'ptvctinf'), 'sdtsterm')
+    textElement(sdtsterm, 'sdtstype', sdtsTypes.get(obj.shapeType, obj.shapeType))
+    return spdoinfo
+
+def projectionElement(wkt):
+    """Returns the CSDGM map projection name and the element holding the parameters of
+       the projection of a well-known text, None if CSDGM has no element for it or one
+       of its parameters is missing"""
+
+    match = projectionPattern.search(wkt)
+    if not match or not match.group(1).lower() in projections:
+        return None
+    name, tag, parameters = projections[match.group(1).lower()]
+    values = dict((key.lower(), value) for key, value in parameterPattern.findall(wkt))
+    elem = ET.Element(tag)
+    for alternatives in parameters:
+        for child, keys in alternatives:
+            found = [values[key] for key in keys if key in values]
+            if found:
+                for value in (found if child == 'stdparll' else found[:1]):
+                    textElement(elem, child, value)
+                break
+        else:
+            return None
+    return name, elem
+
+def unsupportedProjection(obj):
+    """The name of the projection of a feature class if its spref cannot be written
+       without ArcGIS, None otherwise"""
+
+    sr = obj.spatialReference
+    if not sr or sr.get('type') != 'Projected':
+        return None
+    if projectionElement(sr.get('exportString') or '') is not None:
+        return None
+    match = projectionPattern.search(sr.get('exportString') or '')
+    return match.group(1) if match else sr['name']
+
+def sprefElement(obj):
+    """The spref element of a feature class from the spatial reference in the catalog,
+       None for a table, an unknown spatial reference or a projection whose parameters
+       cannot be written"""
+
+    sr = obj.spatialReference
+    if not sr or sr.get('type') not in ('Projected', 'Geographic'):
+        return None
+    projection = None
+    if sr['type'] == 'Projected':
+        projection = projectionElement(sr.get('exportString') or '')
+        if projection is None:
+            return None
+    resolution = sr.get('XYResolution') or 0.0001
+    spref = ET.Element('spref')
+    horizsys = ET.SubElement(spref, 'horizsys')
+    if sr['type'] == 'Geographic':
+        geograph = ET.SubElement(horizsys, 'geograph')
+        textElement(geograph, 'latres', resolution)
+        textElement(geograph, 'longres', resolution)
+        textElement(geograph, 'geogunit', 'Decimal degrees')
+    else:
+        planar = ET.SubElement(horizsys, 'planar')
+        name, parameters = projection
+        utm = utmPattern.search(sr['name'])
+        if utm and parameters.tag == 'transmer':
+            #a UTM zone is a grid coordinate system
+            gridsys = ET.SubElement(planar, 'gridsys')
+            textElement(gridsys, 'gridsysn', 'Universal Transverse Mercator')
+            utmElem = ET.SubElement(gridsys, 'utm')
+            textElement(utmElem, 'utmzone', ('-' if utm.group(2).upper() == 'S' else '') + utm.group(1))
+            utmElem.append(parameters)
+        else:
+            mapproj = ET.SubElement(planar, 'mapproj')
+            textElement(mapproj, 'mapprojn', name)
+            mapproj.append(parameters)
+        planci = ET.SubElement(planar, 'planci')
+        textElement(planci, 'plance', 'coordinate pair')
+        coordrep = ET.SubElement(planci, 'coordrep')
+        textElement(coordrep, 'absres', resolution)
+        textElement(coordrep, 'ordres', resolution)
+        textElement(planci, 'plandu', sr.get('linearUnitName') or 'meters')
+
+    datum = datumPattern.search(sr.get('exportString') or '')
+    if datum:
+        geodetic = ET.SubElement(horizsys, 'geodetic')
+        textElement(geodetic, 'horizdn', datumNames.get(datum.group(1), datum.group(1)))
+        textElement(geodetic, 'ellips', datum.group(2))
+        textElement(geodetic, 'semiaxis', datum.group(3))
+        textElement(geodetic, 'denflat', datum.group(4))
+    return spref
+
+def skeleton(obj, gdbName=''):
+    """Returns the root metadata element of the CSDGM skeleton of a CatalogObject"""
+
+    root = ET.Element('metadata')
+    idinfo = ET.SubElement(root, 'idinfo')
+    citeinfo = ET.SubElement(ET.SubElement(idinfo, 'citation'), 'citeinfo')
+    textElement(citeinfo, 'title', ('%s in %s' % (obj.name, gdbName)) if gdbName else obj.name)
+    for elem in (spdoinfoElement(obj), sprefElement(obj), eainfoElement(obj)):
+        if elem is not None:
+            root.append(elem)
+    metainfo = ET.SubElement(root, 'metainfo')
+    textElement(metainfo, 'metd', time.strftime('%Y%m%d'))
+    textElement(metainfo, 'metstdn', 'FGDC Content Standard for Digital Geospatial Metadata')
+    textElement(metainfo, 'metstdv', 'FGDC-STD-001-1998')
+    return root
+
+def writeSkeleton(obj, path, gdbName=''):
+    """Writes the CSDGM skeleton of a CatalogObject to path"""
+
+    ET.ElementTree(skeleton(obj, gdbName)).write(path, encoding='utf-8', xml_declaration=True)
@@ -0,0 +1,204 @@
+#-------------------------------------------------------------------------------
+# Name:        ncgmp09_stats.py
+# Purpose:     Instrumentation of a metadata run: wall time per stage and per
+#              instrumented function, and for each table its time in each
+#              stage, the cursors opened and rows read through the backend,
+#              the bytes of XML read and written and the peak memory of the
+#              process. Worker processes send their StageTimer back to be
+#              merged, and the whole run can be saved as a JSON report.
+#
+# Author:      ethoms
+#
+# Created:     17/10/2026
+# Copyright:   no copyright
+# Licence:     Creative Commons
+#-------------------------------------------------------------------------------
+#!/usr/bin/env python
+
+import os
+import sys
+import json
+import time
+import threading
+from contextlib import contextmanager
+from ncgmp09_journal import replaceFile
+
+def windowsPeakMemory():
+    """Peak working set of this process in bytes, from GetProcessMemoryInfo"""
+
+    import ctypes
+    from ctypes import wintypes
+
+    class ProcessMemoryCounters(ctypes.Structure):
+        _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                    ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                    ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                    ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                    ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+    counters = ProcessMemoryCounters()
+    counters.cb = ctypes.sizeof(counters)
+    process = ctypes.windll.kernel32.GetCurrentProcess()
+    if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+        return None
+    return counters.PeakWorkingSetSize
+
+def peakMemory():
+    """Peak resident memory of this process in bytes so far, None where it cannot be found"""
+
+    try:
+        import resource
+    except ImportError:
+        try:
+            return windowsPeakMemory()
+        except (ImportError, AttributeError, OSError):
+            return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    #kilobytes on Linux, bytes on Mac OS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def tableRecord():
+    return {'seconds': 0.0, 'stages': {}, 'cursors': 0, 'rows': 0,
+            'bytesRead': 0, 'bytesWritten': 0, 'peakMemory': None}
+
+class StageTimer(object):
+    """Accumulates the wall time spent in each stage of a run along with
+       the number of bytes of XML read and written, the calls of instrumented
+       functions and a record for each table"""
+
+    def __init__(self):
+        self.times = {}
+        self.order = []
+        self.bytesRead = 0
+        self.bytesWritten = 0
+        #function name: [calls, seconds]
+        self.functions = {}
+        #table name: tableRecord()
+        self.tables = {}
+        #thread: record of the table it is working on
+        self.currents = {}
+
+    @property
+    def current(self):
+        """Record of the table the calling thread is working on, None outside of a table"""
+        return self.currents.get(threading.current_thread().ident)
+
+    @current.setter
+    def current(self, record):
+        self.currents[threading.current_thread().ident] = record
+
+    @contextmanager
+    def stage(self, name):
+        start = time.time()
+        try:
+            yield
+        finally:
+            elapsed = time.time() - start
+            if not name in self.times:
+                self.times[name] = 0.0
+                self.order.append(name)
+            self.times[name] += elapsed
+            if self.current is not None:
+                stages = self.current['stages']
+                stages[name] = stages.get(name, 0.0) + elapsed
+
+    @contextmanager
+    def call(self, name):
+        """Times one call of an instrumented function"""
+
+        start = time.time()
+        try:
+            yield
+        finally:
+            record = self.functions.setdefault(name, [0, 0.0])
+            record[0] += 1
+            record[1] += time.time() - start
+
+    @contextmanager
+    def table(self, name, backend=None):
+        """Work done inside is counted for a table. The cursors and rows are read from
+           the counters of a CountingBackend for the calling thread. A table may be entered
+           more than once, eg, once each for its export, update and import"""
+
+        record = self.tables.setdefault(name, tableRecord())
+        previous = self.current
+        self.current = record
+        counts = list(backend.counts()) if backend is not None else None
+        start = time.time()
+        try:
+            yield record
+        finally:
+            record['seconds'] += time.time() - start
+            if counts is not None:
+                after = backend.counts()
+                record['cursors'] += after[0] - counts[0]
+                record['rows'] += after[1] - counts[1]
+            peak = peakMemory()
+            if peak is not None:
+                record['peakMemory'] = max(record['peakMemory'] or 0, peak)
+            self.current = previous
+
+    def tableTime(self, name, stage, seconds):
+        """Adds time measured somewhere else, eg, by a worker process rendering the
+           outputs of the table's XML file, to a stage of the record of a table"""
+
+        record = self.tables.setdefault(name, tableRecord())
+        record['seconds'] += seconds
+        record['stages'][stage] = record['stages'].get(stage, 0.0) + seconds
+
+    def read(self, nBytes):
+        self.bytesRead += nBytes
+        if self.current is not None:
+            self.current['bytesRead'] += nBytes
+
+    def wrote(self, nBytes):
+        self.bytesWritten += nBytes
+        if self.current is not None:
+            self.current['bytesWritten'] += nBytes
+
+    def report(self, pPrint):
+        pPrint('Stage timings:')
+        for name in self.order:
+            pPrint('\t%-12s %8.2f s' % (name, self.times[name]))
+        pPrint('\tXML read: %d bytes, XML written: %d bytes' % (self.bytesRead, self.bytesWritten))
+
+    def merge(self, other):
+        """Adds the timings of another StageTimer, eg, one sent back by a worker process"""
+        for name in other.order:
+            if not name in self.times:
+                self.times[name] = 0.0
+                self.order.append(name)
+            self.times[name] += other.times[name]
+        self.bytesRead += other.bytesRead
+        self.bytesWritten += other.bytesWritten
+        for name, (calls, seconds) in other.functions.items():
+            record = self.functions.setdefault(name, [0, 0.0])
+            record[0] += calls
+            record[1] += seconds
+        for name, otherRecord in other.tables.items():
+            record = self.tables.setdefault(name, tableRecord())
+            for key in ('seconds', 'cursors', 'rows', 'bytesRead', 'bytesWritten'):
+                record[key] += otherRecord[key]
+            for stage, seconds in otherRecord['stages'].items():
+                record['stages'][stage] = record['stages'].get(stage, 0.0) + seconds
+            if otherRecord['peakMemory'] is not None:
+                record['peakMemory'] = max(record['peakMemory'] or 0, otherRecord['peakMemory'])
+
+    def asDict(self):
+        return {'stages': dict((name, self.times[name]) for name in self.order), 'stageOrder': self.order,
+                'bytesRead': self.bytesRead, 'bytesWritten': self.bytesWritten,
+                'functions': dict((name, {'calls': calls, 'seconds': seconds})
+                                  for name, (calls, seconds) in self.functions.items()),
+                'tables': self.tables, 'peakMemory': peakMemory()}
+
+def writeReport(path, timer, run):
+    """Writes the JSON report of a run: the run dictionary (parameters, totals) and the
+       timings of the StageTimer. Tables are also listed slowest first"""
+
+    report = dict(run)
+    report.update(timer.asDict())
+    report['slowestTables'] = sorted(timer.tables, key=lambda name: timer.tables[name]['seconds'], reverse=True)
+    tmpPath = '%s.%d' % (path, os.getpid())
+    with open(tmpPath, 'w') as f:
+        json.dump(report, f, indent=1, sort_keys=True)
+    replaceFile(tmpPath, path)
@@ -0,0 +1,74 @@
+#-------------------------------------------------------------------------------
+# Name:        ncgmp09_template.py
+# Purpose:     Template sections ('idinfo', 'dataqual', 'distinfo', 'metainfo')
+#              prepared once from a template metadata record and spliced into
+#              every exported metadata document.
+#              The sections are shared between documents rather than deep-copied.
+#              Only the chain of elements from idinfo down to the title, the one
+#              per-file slot, is copied for each document, so the cost per file
+#              does not depend on the size of the template.
+#
+# Author:      ethoms
+#
+# Created:     17/10/2026, from addTemplateItems of ncgmp09_update_md.py
+#              (17/04/2015)
+# Copyright:   no copyright
+# Licence:     Creative Commons
+#-------------------------------------------------------------------------------
+#!/usr/bin/env python
+
+import xml.etree.ElementTree as ET
+
+def shallowCopy(elem):
+    """A new element with the tag, attributes, text and tail of elem and the
+       same (not copied) children"""
+
+    new = ET.Element(elem.tag, dict(elem.attrib))
+    new.text = elem.text
+    new.tail = elem.tail
+    new.extend(list(elem))
+    return new
+
+def childPath(parent, tag):
+    """Returns the list of child positions leading from parent to the first
+       descendant with the tag, in document order, or None if there is none"""
+
+    for i, child in enumerate(parent):
+        if child.tag == tag:
+            return [i]
+        path = childPath(child, tag)
+        if path is not None:
+            return [i] + path
+    return None
+
+class TemplateFragments(object):
+    """The sections of a template metadata record, parsed once"""
+
+    def __init__(self, template, elementNames):
+        tempDoc = ET.parse(template)
+        self.sections = {}
+        for name in elementNames:
+            self.sections[name] = tempDoc.find(name)
+
+        #the title of the citation is the slot filled in for each file
+        self.titlePath = None
+        if self.sections.get('idinfo') is not None:
+            self.titlePath = childPath(self.sections['idinfo'], 'title')
+
+    def section(self, name, title=None):
+        """Returns the template section to splice into a document, None if the template
+           does not have it. For idinfo a title may be given for the citation title"""
+
+        elem = self.sections.get(name)
+        if elem is None or title is None or name != 'idinfo' or self.titlePath is None:
+            return elem
+
+        #copy only the elements from idinfo down to the title, everything else is shared
+        top = shallowCopy(elem)
+        parent = top
+        for i in self.titlePath:
+            child = shallowCopy(parent[i])
+            parent[i] = child
+            parent = child
+        parent.text = title
+        return top
@@ -0,0 +1,168 @@
+#-------------------------------------------------------------------------------
+# Name:        ncgmp09_terms.py
+# Purpose:     Finds the unique terms in the controlled-vocabulary fields of
+#              NCGMP09 tables and feature classes.
+#              All the controlled fields of a table are read in a single cursor
+#              pass and the unique values are collected in one set per field.
+#              Optionally the unique values can be asked for from the data
+#              source itself with SELECT DISTINCT where the workspace supports it.
+#              Tables are read through a data-access backend, arcpy by default.
+#              TermIndex records where each term was found, (table, field) and
+#              the number of rows, for the glossary stub.
+#              Used by both ncgmp09_update_md.py and glossaryStub.py
+#
+# Author:      ethoms
+#
+# Created:     17/10/2026, from ncgmp09_update_md.py and glossaryStub.py
+#              (17/04/2015)
+# Copyright:   no copyright
+# Licence:     Creative Commons
+#-------------------------------------------------------------------------------
+#!/usr/bin/env python
+
+import os
+import csv
+import json
+from ncgmp09_backends import defaultBackend
+
+def controlledFieldNames(table, controlledFields, fieldNames=None, backend=None):
+    """Returns a list of the field names in a table that are also in the list of controlled fields.
+       fieldNames may be passed in (eg, from a catalog snapshot) to save listing the fields"""
+
+    if fieldNames is None:
+        fieldNames = [fld.name for fld in (backend or defaultBackend()).listFields(table)]
+    return [name for name in fieldNames if name in controlledFields]
+
+def distinctTerms(table, fields, backend):
+    """Asks the data source for the distinct values of each field.
+       Only the distinct values leave the database, one small query per field"""
+
+    terms = {}
+    for fld in fields:
+        terms[fld] = set(row[0] for row in backend.rows(table, [fld], distinct=True))
+    return terms
+
+def scanTerms(table, fields, distinct=False, backend=None):
+    """Returns a dictionary of {field name: set of unique terms} for the fields asked for.
+       If distinct is True and the workspace supports it, the data source finds the
+       unique values, otherwise every row of the table is read once.
+       Empty and null values are not terms"""
+
+    if not fields:
+        return {}
+
+    if backend is None:
+        backend = defaultBackend()
+    if distinct and backend.supportsDistinct(table):
+        try:
+            terms = distinctTerms(table, fields, backend)
+        except RuntimeError:
+            #the workspace said yes but this table would not, scan it instead
+            terms = readTerms(table, fields, backend)
+    else:
+        terms = readTerms(table, fields, backend)
+
+    for termSet in terms.values():
+        termSet.discard(None)
+        termSet.discard("")
+    return terms
+
+def readTerms(table, fields, backend):
+    """Reads every row of a table once and returns a dictionary of
+       {field name: set of values} for the fields asked for"""
+
+    terms = dict((fld, set()) for fld in fields)
+
+    #bind the set.add of each field once so the inner loop is just the row values
+    adders = [terms[fld].add for fld in fields]
+    for row in backend.rows(table, fields):
+        for add, value in zip(adders, row):
+            add(value)
+    return terms
+
+def countTerms(table, fields, backend):
+    """Reads every row of a table once and returns a dictionary of
+       {field name: {value: number of rows}} for the fields asked for"""
+
+    counts = dict((fld, {}) for fld in fields)
+    fieldCounts = [counts[fld] for fld in fields]
+    for row in backend.rows(table, fields):
+        for fieldCount, value in zip(fieldCounts, row):
+            fieldCount[value] = fieldCount.get(value, 0) + 1
+    for fieldCount in fieldCounts:
+        fieldCount.pop(None, None)
+        fieldCount.pop("", None)
+    return counts
+
+class TermIndex(object):
+    """term: {(table, field): number of rows} for the controlled fields of a geodatabase.
+       Counts are None for terms found with SELECT DISTINCT, which does not count rows"""
+
+    def __init__(self):
+        self.terms = {}
+        #terms in the order they were first found
+        self.order = []
+
+    def add(self, table, fld, counts):
+        """Adds the {term: count} of one field of a table, or a set of terms if not counted"""
+
+        name = os.path.basename(table)
+        for term in sorted(counts):
+            sources = self.terms.get(term)
+            if sources is None:
+                sources = self.terms[term] = {}
+                self.order.append(term)
+            sources[(name, fld)] = counts[term] if isinstance(counts, dict) else None
+
+    def scanTable(self, table, fields, distinct=False, backend=None):
+        """Adds the terms of the controlled fields of a table, read in one pass"""
+
+        if not fields:
+            return
+        if backend is None:
+            backend = defaultBackend()
+        if distinct and backend.supportsDistinct(table):
+            terms = scanTerms(table, fields, True, backend)
+        else:
+            terms = countTerms(table, fields, backend)
+        for fld in fields:
+            self.add(table, fld, terms[fld])
+
+    def missing(self, existing):
+        """The terms that are not in existing, a set, in the order they were found"""
+
+        new = set(self.terms) - existing
+        return [term for term in self.order if term in new]
+
+    def items(self):
+        """(term, table, field, count) rows of the index in the order the terms were found"""
+
+        for term in self.order:
+            for (table, fld), count in sorted(self.terms[term].items()):
+                yield term, table, fld, count
+
+    def writeCSV(self, path):
+        with open(path, 'wb' if str is bytes else 'w') as f:
+            writer = csv.writer(f)
+            writer.writerow(['Term', 'Table', 'Field', 'Count'])
+            for term, table, fld, count in self.items():
+                row = [term, table, fld, '' if count is None else count]
+                if str is bytes:
+                    #the Python 2 csv module only writes byte strings
+                    row = [v.encode('utf-8') if isinstance(v, unicode) else v for v in row]
+                writer.writerow(row)
+
+    def writeJSON(self, path):
+        index = {}
+        for term, table, fld, count in self.items():
+            index.setdefault(term, []).append({'table': table, 'field': fld, 'count': count})
+        with open(path, 'w') as f:
+            json.dump(index, f, indent=1, sort_keys=True)
+
+    def write(self, path):
+        """Writes the index to a .json file or, for any other extension, a CSV file"""
+
+        if path.lower().endswith('.json'):
+            self.writeJSON(path)
+        else:
+            self.writeCSV(path)
@@ -23,471 +23,834 @@
 #-------------------------------------------------------------------------------
 #!/usr/bin/env python
 
-import arcpy
 import os
 import sys
-from xml.dom.minidom import *
+import time
+import argparse
+import multiprocessing
 import glob
+import traceback
 import xml.etree.ElementTree as ET
-import copy
-from subprocess import call
+import cProfile
+from functools import wraps
+from ncgmp09_lookups import LookupIndex
+from ncgmp09_domains import attrIndex, writeDomains, writeMetadata, StreamedDomains, FragmentCache
+from ncgmp09_terms import controlledFieldNames, scanTerms
+from ncgmp09_backends import openBackend, CountingBackend
+from ncgmp09_mp import runMP, reportMP
+from ncgmp09_manifest import Manifest, fileHash, dataHash
+from ncgmp09_catalog import Catalog
+from ncgmp09_definitions import DefinitionsIndex, mergeDefinitions
+from ncgmp09_template import TemplateFragments
+from ncgmp09_render import renderFiles, reportRender
+from ncgmp09_skeleton import writeSkeleton, unsupportedProjection
+from ncgmp09_stats import StageTimer, writeReport
+from ncgmp09_pipeline import Stage, runPipeline, reportPipeline
+from ncgmp09_watch import watcherFor
+from ncgmp09_journal import Journal, WorkerCheckpoints, tempPath, replaceFile
 
 #*****************************************************************************
 def pPrint(text):
-    """Print to the interactive screen and to geoprocessing results"""
+    """Print to the interactive screen and to geoprocessing results.
+       In a worker process the messages are kept for the parent process to print"""
 	
-    print text
-    arcpy.AddMessage(text)
+    if workerMessages is not None:
+        workerMessages.append(text)
+        return
+    try:
+        print text
+    except UnicodeEncodeError:
+        #a console or pipe that cannot show a term
+        print text.encode('ascii', 'backslashreplace')
+    if backend is not None:
+        backend.message(text)
     
     
-def buildWhereClause(table, field, value):
-    """Constructs a SQL WHERE clause to select rows having the specified value
-    within a given field and table. Uses field delimiters to determine the proper
-    syntax for any data source and field type"""
+def pVerbose(text):
+    """Per-table and per-field detail, only printed with --verbose"""
 
-    # Add DBMS-specific field delimiters
-    fieldDelimited = arcpy.AddFieldDelimiters(table, field)
+    if options.verbose:
+        pPrint(text)
 
-    # Determine field type
-    fieldType = arcpy.ListFields(table, field)[0].type
+def stageDone(table, stage):
+    """True if the run being resumed finished this stage of the table. Nothing counts
+       as done once the XML file of the table is gone"""
 
-    # Add single-quotes for string field values
-    if str(fieldType) == 'String':
-        value = "'%s'" % value
+    return journal.isDone(table, stage) and os.path.exists(os.path.join(outDir, table + '.xml'))
 
-    # Format WHERE clause
-    whereClause = "%s = %s" % (fieldDelimited, value)
-    return whereClause
-    
+def instrumented(func):
+    """Records the number of calls and the wall time of a function in the run's StageTimer"""
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with timer.call(func.__name__):
+            return func(*args, **kwargs)
+    return wrapper
+
+@instrumented
 def tableList(gdb):   
-    """"Returns a list of (name, catalog path) tuples for all tables and feature classes in an ESRI gdb"""
+    """"Returns a list of (name, catalog path) tuples for all tables and feature classes in an ESRI gdb.
+        Read from the catalog snapshot made once at the start of the run"""
 	
-    arcpy.env.workspace = gdb
-    tables = []
-    
-    #get a list of the standalone tables in the geodatabase
-    for tab in arcpy.ListTables():
-        desc = arcpy.Describe(tab)
-        tables.append([desc.name, desc.catalogPath])
-    
-    #get a list of the feature datasets in the geodatabase
-    #when arcpy.env.workspace = arcpy.Describe(fd).catalogPath
-    #was used, only the first pass resulted in a full qualified
-    #path, the second time I only got the name of the dataset
-    #but if I make a list of the catalogPaths, I can pass those items to
-    #arcpy.env.workspace
-    datasets = []
-    for fd in arcpy.ListDatasets():
-        datasets.append(arcpy.Describe(fd).catalogPath)
-        
-    #run through the datasets and get a list of the feature classes
-    for fd in datasets:
-        arcpy.env.workspace = fd
-        for fc in arcpy.ListFeatureClasses():
-            desc = arcpy.Describe(fc)
-            tables.append([desc.name, desc.catalogPath])
-    return tables
-
-def exportMD(gdb):   
-    """"Export FGDC XML metadata file for each gdb object
+    return catalog.tableList()
+
+@instrumented
+def exportTable(table, path):
+    """Export the FGDC XML metadata file for one gdb object and return the path to the file"""
+    if stageDone(table, 'export'):
+        pVerbose('%s was exported by the run being resumed' % table)
+        return os.path.join(outDir, table + '.xml')
+    with timer.table(table, backend):
+        with timer.stage('export'):
+            fXML = exportTableXML(table, path)
+    journal.done(table, 'export')
+    return fXML
+
+def exportTableXML(table, path):
+    """Writes the XML file of one table with the export engine asked for.
+       The file is written under a temporary name and renamed when it is complete"""
+    fXML = os.path.join(outDir, table + '.xml')
+    tmpXML = tempPath(fXML)
+    if os.path.exists(tmpXML):
+        os.remove(tmpXML)
+		
+    if options.export == 'arcgis':
+        #won't work when run outside of ArcCatalog or ArcMap for some reason!!!
+        #arcpy.USGSMPTranslator_conversion(path, '', 'XML', fXML)
+        backend.exportMetadata(path, translator, tmpXML)
+    else:
+        #build the eainfo, spdoinfo and spref skeleton from the catalog, no translator or XSLT
+        obj = catalog.get(path)
+        writeSkeleton(obj, tmpXML, os.path.basename(gdb))
+        projection = unsupportedProjection(obj)
+        if projection:
+            pPrint('%s: the parameters of the %s projection cannot be written without ArcGIS, spref was left out; '
+                   'run with --export arcgis to describe it' % (table, projection))
+    replaceFile(tmpXML, fXML)
+
+    pVerbose('%s has been created' % fXML)
+    return fXML
+
+@instrumented
+def exportMD(tables):   
+    """"Export FGDC XML metadata file for each gdb object in a list of (name, catalog path) items
         Collect a list of the paths to these files for later use"""
     xmls = []
-    #objList is a list of all feature classes and standalone tables and their paths
-    for dsPath in tableList(gdb):
+    #tables is a list of all feature classes and standalone tables and their paths
+    for dsPath in tables:
         table = dsPath[0] #name of the table
         path = dsPath[1]  #catalogPath of the table
-        fXML = os.path.join(outDir, table + '.xml')
-        if os.path.exists(fXML):
-            os.remove(fXML)
-			
-       #won't work when run outside of ArcCatalog or ArcMap for some reason!!!
-        #arcpy.USGSMPTranslator_conversion(path, '', 'XML', fXML)
-        arcpy.ExportMetadata_conversion(path, translator, fXML)
-        xmls.append(fXML)
-
-        pPrint('%s has been created' % fXML)
+        xmls.append(exportTable(table, path))
 		
     return xmls
 
-def importMD(gdb): 
-    """Import XML back into the target feature class or table."""
-    for dsPath in tableList(gdb):
-        table = dsPath[0]
-        target = dsPath[1]
-        source = os.path.join(outDir, table + '.xml')
-        if os.path.exists(source):
-            pPrint("Importing metadata into %s" % target)
-            arcpy.ImportMetadata_conversion(source, "FROM_FGDC", target)
-        else:
-            pPrint("Could not find a metadata file for \n %s" % target)
+@instrumented
+def importTable(table, target):
+    """Import the XML file of one table back into the target feature class or table."""
+    #only arcpy can store the metadata back in the gdb
+    if not backend.storesMetadata:
+        return
+    if stageDone(table, 'import'):
+        pVerbose('%s was imported by the run being resumed' % target)
+        return
+    source = os.path.join(outDir, table + '.xml')
+    if os.path.exists(source):
+        pVerbose("Importing metadata into %s" % target)
+        with timer.table(table, backend):
+            with timer.stage('import'):
+                backend.importMetadata(source, target)
+        journal.done(table, 'import')
+    else:
+        pPrint("Could not find a metadata file for \n %s" % target)
+
+@instrumented
+def importMD(tables): 
+    """Import XML back into the target feature classes or tables."""
+    for dsPath in tables:
+        importTable(dsPath[0], dsPath[1])
     
 def parentFolder(gdbPath):  
-    """Return the parent folder path of an ArcCatalog object.
-       Queries dataType because objects within feature datasets have paths
-       which are delimited as if they were system folders when they are not"""
+    """Return the parent folder path of an ArcCatalog object."""
 	
-    pFolder = gdbPath
-    while not arcpy.Describe(pFolder).dataType =='Folder':
-        pFolder = os.path.split(pFolder)[0]
-    return pFolder
+    return backend.parentFolder(gdbPath)
 
 def fieldNameList(table):    
     """Returns a list of field names from input table that are also in the list of NCGMP09 controlled fields"""
 	
-    fldList = arcpy.ListFields(table)
-    nameList = []
-    for fld in fldList:
-        if fld.name in controlledFields:
-            nameList.append(fld.name)
-    return nameList
+    return controlledFieldNames(table, controlledFields, catalog.fieldNames(table))
 
-def findSourceRef(sourceID):
-    """Finds the source reference for each DataSource_ID"""
-	
-    query = buildWhereClause(dataSources, "DataSources_ID", sourceID)
-    rows = arcpy.da.SearchCursor(dataSources, ["Source"], query)
-    try:
-        row = rows.next()
-        return row[0]
-    except:
-        return ""
-
-def updateDomains(table, fldList, fcXML):
+@instrumented
+def updateDomains(table, fldList, root, fieldTerms=None, streams=None):
     """1) Finds all controlled-vocabulary fields in the table sent to it
-       2) Builds a set of unique terms in each field, ie, the domain
-       3) Matches each domain value to an entry in the glossary
+       2) Builds a set of unique terms in each field, ie, the domain, reading all
+          of the fields in one pass through the table
+       3) Matches each domain value to an entry in the glossary (or the DMU and DataSources)
+          through the in-memory lookup indexes
        4) Builds a dictionary of term:(definition, source) items
        5) Takes the dictionary items and put them into the metadata
-          document as Attribute_Domain_Values"""
+          document (an ElementTree root element) as Attribute_Domain_Values
+       fieldTerms may be passed in if the terms of the table have already been read.
+       If a StreamedDomains object is passed in, the domains are not built at all,
+       they are streamed from the lookup indexes when the document is written"""
 
-    dom = parse(fcXML)
-    
     #for each field in fldList (controlled fields)
-    pPrint('Adding values, definitions, data sources in %s for the following fields:' % fcXML)
+    pVerbose('Adding values, definitions, data sources for the following fields:')
+    domains = {}
+    index = attrIndex(root)
+    #read all the controlled fields of the table in one pass
+    if fieldTerms is None:
+        fieldTerms = scanTerms(table, fldList, options.distinct, backend)
     for fld in fldList:
-        pPrint('\t%s' % fld)
-        termList = []
-        for row in arcpy.da.SearchCursor(table, [fld]):
-            if not row[0] in termList and not row[0] == None and not row[0] == "":
-                termList.append(row[0])
+        pVerbose('\t%s' % fld)
+        termList = sorted(fieldTerms[fld])
                 
-        #create an empty dictionary object to hold the matches between the unique terms
-        #and their definitions (grabbed from the glossary)
-        defs = {}
-        cantfind = []
-        
-        #for each unique term, try to create a search cursor of just one record where the term
-        #matchs a Term field value from the glossary
+        #match each unique term to its definition and source through the lookup indexes
         #Map Units are a special case because their definition is not in the Glossary but the DMU
-        if fld == 'MapUnit':
-            for unit in termList:
-                query = buildWhereClause(DMU, fld, unit)
-                rows = arcpy.da.SearchCursor(DMU, ["FullName", "DescriptionSourceID"], query)
-                try:
-                    row = rows.next()
-                    #create an entry in the dictionary of term:[definition, source] key:value pairs
-                    #this is how we will enumerate through the enumerated_domain section
-                    defs[unit] = []
-                    defs[unit].append(row[0])
-                    defs[unit].append(findSourceRef(row[1]))
-                    
-                #otherwise, add the term to the cantfind list 
-                except:
-                    cantfind.append(unit)
-        elif fld == 'DataSourceID':
-            for das in termList:
-                query = buildWhereClause(dataSources, 'DataSources_ID', das)
-                rows = arcpy.da.SearchCursor(dataSources, ["DataSources_ID", "Source"], query)
-                try:
-                    row = rows.next()
-                    #create an entry in the dictionary of term:[definition, source] key:value pairs
-                    #this is how we will enumerate through the enumerated_domain section
-                    defs[das] = []
-                    defs[das].append(row[1])
-                    defs[das].append('This study')
-                    
-                #otherwise, add the term to the cantfind list 
-                except:
-                    cantfind.append(das)                
+        if streams is None:
+            defs, cantfind = lookups.resolveTerms(fld, termList)
+            domains[fld] = defs
         else:
-            for term in termList:
-                #pull a term from the values in the controlled field
-                query = buildWhereClause(glossary, "Term", term)
-                #search for that term in the Glossary
-                rows = arcpy.da.SearchCursor(glossary, ["Definition", "DefinitionSourceID"], query)
-
-                #Create an entry in the dictionary of term:[definition, source] key:value pairs
-                #this is how we will enumerate through the enumerated_domain section
-                try:
-                    row = rows.next()
-                    defs[term] = []
-                    defs[term].append(row[0])
-                    defs[term].append(findSourceRef(row[1]))
-                    
-                #otherwise, add the term to the cantfind list 
-                except:
-                    cantfind.append(term)
-                
-        #pPrint(cantfind)
+            cantfind = lookups.missingTerms(fld, termList)
+            #each call makes a new iterator, the field may appear in more than one attr
+            rows = lambda fld=fld, termList=termList: lookups.iterDefinitions(fld, termList)
+            streams.add(root, fld, rows, index)
     
         if not len(cantfind) == 0:
-            pPrint('\t\tCannot find definition(s) for the following term(s):')
-            pPrint('\t\t'.join(cantfind))
+            undefinedTerms.setdefault(os.path.basename(table), {})[fld] = cantfind
+            pPrint('\t%s in %s, cannot find definition(s) for: %s' % (fld, os.path.basename(table), ', '.join(cantfind)))
         else:
-           pPrint('\t\tAll terms are defined in the metadata')
-
-        #write these definitions to the XML tree
-        #work on this
-        #root = ET.parse(fcXML).getroot()
-        #tree = ET.ElementTree(writeFieldDomain(fld, defs, dom))
-        #pPrint(fld)
-        #pPrint(defs)
-     
-        dom = writeFieldDomain(fld, defs, dom)
-                
-        #save the xml file
-        dom.saveXML
-        pPrint("writing to modified")
-        outf = open(fcXML, 'w')
-        dom.writexml(outf)
-        outf.close()
-    
-def writeFieldDomain(fld, defs, dom):  
-    """Write the term:(definition, source) items to elements in the metadata XML.
-       Currently uses xml.dom.minidom. Should update this to ElementTree!"""
-    ##element tag names are
-    ## attr             = Attribute
-    ## attrlabl         = Attribute_Label
-    ## attrdomv         = Attribute_Domain_Values
-    ## edom             = Enumerated_Domain
-    ## edomv            = Enumerated_Domain_Value
-    ## edomd            = Enumerated_Domain_Definition
-    ## edomvds          = Enumerated_Domain_Value_Definition_Source
-    sorted(defs)
-    labelNodes = dom.getElementsByTagName('attrlabl')
-    for attrlabl in labelNodes:
-        if attrlabl.firstChild.data == fld:
-            attr = attrlabl.parentNode
-            #if attrdomv exists in this node, remove it.
-            #it would get written there because there is a placeholder for it in 
-            #NCGMP09_entity_definitions.xml in case no enumerated domain values are found
-            if not len(attr.getElementsByTagName('attrdomv')) == 0:
-                attr.removeChild(attr.getElementsByTagName('attrdomv')[0])
-             
-            #attrdomv = dom.createElement('attrdomv')
-            #for k in defs.iteritems():
-            for key in sorted(defs):
-                edom = dom.createElement('edom')
-                        
-                edomv = dom.createElement('edomv')
-                #edomvText = dom.createTextNode(k[0])
-                edomvText = dom.createTextNode(key)
-                edomv.appendChild(edomvText)
-        
-                edomvd = dom.createElement('edomvd')
-                #edomvdText = dom.createTextNode(k[1][0])
-                edomvdText = dom.createTextNode(defs[key][0])
-                edomvd.appendChild(edomvdText)
-                                
-                edomvds = dom.createElement('edomvds')
-                #edomvdsText = dom.createTextNode(k[1][1])
-                edomvdsText = dom.createTextNode(defs[key][1])
-                edomvds.appendChild(edomvdsText)
-        
-                edom.appendChild(edomv)
-                edom.appendChild(edomvd)
-                edom.appendChild(edomvds)
-                
-                #append enumerated domain to an attribute domain values node
-                attrdomv = dom.createElement('attrdomv')
-                attrdomv.appendChild(edom)
-                
-                # append attribute domain values node to attribute node
-                attr.appendChild(attrdomv)
-                
-            # #if attrdomv exists in this node, replace it
-            # if not len(attr.getElementsByTagName('attrdomv')) == 0:
-                # attr.replaceChild(attrdomv, attr.getElementsByTagName('attrdomv')[0])
-            # #else append it
-            # else:
-                # attr.appendChild(attrdomv)
-                
-    return dom
+           pVerbose('\t\tAll terms are defined in the metadata')
+
+    #write the definitions of all the fields to the XML tree in one pass,
+    #the file is saved once all stages are done
+    with timer.call('writeDomains'):
+        return writeDomains(root, domains, index, fragments)
                 
-def addAttributeDomains():  
-    """Control flow function for exporting metadata and updating field domains"""
+def loadResources():
+    """Parses the template and opens the index of table and field definitions once for the run.
+       Returns the template document and the definitions index, either may be None"""
+
+    tempDoc = None
+    tDefsDict = None
+    if template:
+        with timer.stage('template'):
+            tempDoc = sharedResource(TemplateFragments, template, templateElements)
+    if addDefs:
+        #The compiled index of table names and field names, where the definitions are ElementTree elements
+        #ready to be inserted. Loaded from its cache file the first time a definition is looked up
+        tDefsDict = sharedResource(DefinitionsIndex, NCGMP09_defs)
+    return tempDoc, tDefsDict
+
+def sharedResource(kind, path, *args):
+    """Returns kind(path, *args), made once per process and kept until the file changes,
+       so the gdbs of a batch run share the parsed template and definitions"""
+
+    key = (kind.__name__, path)
+    modified = os.path.getmtime(path)
+    if not key in loadedFiles or loadedFiles[key][0] != modified:
+        loadedFiles[key] = (modified, kind(path, *args))
+    return loadedFiles[key][1]
+
+def updateTableMetadata(table, path, tempDoc, tDefsDict, fieldTerms=None):
+    """Parses the exported XML file of one table once, passes it through the template,
+       definition and domain stages as an ElementTree and writes it once at the end"""
+
+    if stageDone(table, 'update'):
+        pVerbose('%s was updated by the run being resumed' % table)
+        return os.path.join(outDir, table + '.xml')
+    with timer.table(table, backend):
+        mdXML = updateTableXML(table, path, tempDoc, tDefsDict, fieldTerms)
+    journal.done(table, 'update')
+    return mdXML
+
+def updateTableXML(table, path, tempDoc, tDefsDict, fieldTerms):
+    #we JUST made an xml file for this object so the file had better be there!
+    mdXML = os.path.join(outDir, table + '.xml')
+    with timer.stage('parse'):
+        root = ET.parse(mdXML).getroot()
+        timer.read(os.path.getsize(mdXML))
+
+    #if a template XML was provided, copy the template items
+    if tempDoc is not None:
+        with timer.stage('template'):
+            addTemplateItems(root, mdXML, tempDoc)
+
+    #if the user wants table and field definitions:
+    if tDefsDict is not None:
+        with timer.stage('definitions'):
+            addTableFieldDefinitions(root, mdXML, tDefsDict)
+	
+    #get a list of the fields in this table that are in the NCGMP09
+    #controlled fields list. Send the function the full catalog path
+    #just to be sure it can be located
+    #Should we get this list from the exported XML with ElementTree instead
+    #of arcpy? Would probably be faster...
+    #update the 'domains' (entity, attribute pairs for those controlled fields)
+    with timer.stage('domains'):
+        fldNameList = fieldNameList(path)
+        streams = None
+        if options.stream_domains:
+            streams = StreamedDomains()
+        updateDomains(path, fldNameList, root, fieldTerms, streams)
+
+    #save the xml file, streaming the domains if they were not built,
+    #under a temporary name so the exported file is only replaced once it is complete
+    with timer.stage('write'):
+        tmpXML = tempPath(mdXML)
+        writeMetadata(root, tmpXML, streams)
+        replaceFile(tmpXML, mdXML)
+        timer.wrote(os.path.getsize(mdXML))
+    pVerbose('%s has been updated' % mdXML)
+    return mdXML
+
+def updateMetadata(tables, tableTerms):  
+    """Control flow function for updating the exported metadata.
+       Each XML file is parsed once, passed through the template, definition
+       and domain stages as an ElementTree and written once at the end.
+       tableTerms holds the controlled field terms of the tables already read"""
+
+    tempDoc, tDefsDict = loadResources()
 
     #For each table in the list, collect the name, the list of controlled fields, and then
     #populate the attribute domains from the Glossary
-    for dsPath in tableList(gdb):
+    for dsPath in tables:
+        updateTableMetadata(dsPath[0], dsPath[1], tempDoc, tDefsDict, tableTerms.get(dsPath[0]))
+
+def runHash():
+    """Hash of the inputs shared by every table: the template, the entity definitions
+       and the parameters that change what gets written"""
+
+    return dataHash([fileHash(template), template, fileHash(NCGMP09_defs) if addDefs else '',
+                     addDefs, validate, outList, options.export,
+                     options.renderer, options.validator])
+
+def tableSignature(path, fieldTerms, shared):
+    """Hash of everything the metadata of one table is built from: the shared inputs,
+       the schema of the table (the name, type, alias and length of each field and the
+       shape type and spatial reference of a feature class), its controlled field terms
+       and their definitions"""
+
+    obj = catalog.get(path)
+    fields = [[fld.name, fld.type, fld.aliasName, fld.length] for fld in obj.fields]
+    schema = [fields, obj.shapeType, obj.spatialReference]
+    domains = {}
+    for fld in fieldTerms:
+        domains[fld] = [[term, lookups.resolve(fld, term)] for term in sorted(fieldTerms[fld])]
+    return dataHash([shared, schema, domains])
+
+def changedTables(tables, manifest):
+    """Reads the controlled field terms of every table and compares the hash of the
+       inputs of each table with the manifest of the last run.
+       Returns the tables that need rebuilding, their terms and their new hashes"""
+
+    shared = runHash()
+    changed = []
+    tableTerms = {}
+    signatures = {}
+    for dsPath in tables:
         table = dsPath[0]
         path = dsPath[1]
-		
-		#get a list of the fields in this table that are in the NCGMP09
-        #controlled fields list. Send the function the full catalog path
-        #just to be sure it can be located
-        #Should we get this list from the exported XML with ElementTree instead
-        #of arcpy? Would probably be faster...
-        fldNameList = fieldNameList(path)
-        
-		#we JUST made an xml file for this object so the file had better be there!
-        mdXML = os.path.join(outDir, table + '.xml')
-		
-        #update the 'domains' (entity, attribute pairs for those controlled fields)
-        updateDomains(path, fldNameList, mdXML)
+        with timer.table(table, backend):
+            fieldTerms = scanTerms(path, fieldNameList(path), options.distinct, backend)
+        signature = tableSignature(path, fieldTerms, shared)
+        if manifest.isCurrent(table, signature, os.path.join(outDir, table + '.xml')):
+            pVerbose('%s has not changed since the last run' % table)
+            continue
+        changed.append(dsPath)
+        tableTerms[table] = fieldTerms
+        signatures[table] = signature
+    return changed, tableTerms, signatures
+
+def initWorker(argv, snapshot, finished):
+    """Sets up a worker process: the globals of the run from the tool parameters,
+       the catalog snapshot and the checkpoints of the parent process, a message buffer
+       and timer, and its own copy of the template and definitions"""
+
+    global workerMessages, timer, resources, catalog, journal
+    configure(argv)
+    catalog = snapshot
+    journal = WorkerCheckpoints(finished)
+    workerMessages = []
+    timer = StageTimer()
+    resources = loadResources()
+
+def processTable(job):
+    """Runs the export, template, definitions, domains and import chain for one table
+       in a worker process. job is a (name, catalog path) item and the controlled field
+       terms of the table, if they have been read already.
+       Returns the path of the XML file, the messages, the stage timings, the undefined
+       terms and the stages finished of the table for the parent process to report"""
+
+    global timer
+    del workerMessages[:]
+    del journal.new[:]
+    undefinedTerms.clear()
+    timer = StageTimer()
+    dsPath, fieldTerms = job
+    table = dsPath[0]
+    path = dsPath[1]
+
+    exportTable(table, path)
+    mdXML = updateTableMetadata(table, path, resources[0], resources[1], fieldTerms)
+    importTable(table, path)
+    return mdXML, list(workerMessages), timer, dict(undefinedTerms), list(journal.new)
+
+def processTablesParallel(tables, tableTerms, workers):
+    """Processes a list of tables in a pool of worker processes, each table's
+       export -> update -> import chain in one worker. Messages and timings are
+       gathered back in table order. Returns the list of XML files"""
+
+    pPrint('Processing tables with %d worker processes' % workers)
+    xmls = []
+    jobs = [(dsPath, tableTerms.get(dsPath[0])) for dsPath in tables]
+    pool = multiprocessing.Pool(workers, initWorker, (toolArgs, catalog, journal.finished))
+    try:
+        for mdXML, messages, tableTimer, tableUndefined, finished in pool.imap(processTable, jobs):
+            for text in messages:
+                pPrint(text)
+            timer.merge(tableTimer)
+            undefinedTerms.update(tableUndefined)
+            for table, stage in finished:
+                journal.done(table, stage)
+            xmls.append(mdXML)
+        pool.close()
+    except:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+    return xmls
 
-def addTemplateItems():
-    """Takes a list of metadata elements from a template XML and migrates 
-       them to all FGDC metadata XML files in the output folder"""
+def processTablesPipelined(tables, tableTerms):
+    """Processes a list of tables with the export, update and import stages overlapping:
+       each stage runs in its own thread and hands a table on to the next one through a
+       queue as soon as it is done with it, so the XML of a table is transformed while
+       ArcGIS exports the next table and imported while the one after it is transformed.
+       Returns the list of XML files"""
 
-    #qPath = os.path.join(outDir, '*.xml')
-    #xmls = glob.glob(qPath)
-	
-	#create the template document
-    tempDoc = ET.parse(template)
-
-	#go through the exported XML files
-    for x in xmlList:
-        fName = os.path.splitext(os.path.basename(x))[0]
-        GDB = os.path.basename(gdb)
-        root = ET.parse(x).getroot()
-        if root.tag == 'metadata':
-            #remove the existing elements
-            for elementName in templateElements:
-                #if root.find(elementName) is not None:
-                if root.find(elementName): 
-                    root.remove(root.find(elementName))
-
-                #now insert the copies from the template
-                #need to go trough one by one because two of the elements we insert by index
-                #and the other two we simply append in order to maintain the FGDC order
-                copyElem = copy.deepcopy(tempDoc.find(elementName))
-                if elementName == 'idinfo':
-                    root.insert(0, copyElem)
-                    title = list(copyElem.iter('title'))[0]
-                    title.text = 'Metadata for %s in %s' % (fName, GDB) 
-                elif elementName == 'dataqual':
-                    root.insert(1, copyElem)
-                elif elementName == 'distinfo':
-                    root.append(copyElem)
-                elif elementName == 'metainfo':
-                    root.append(copyElem)
-        else:
-            pPrint('%s\ndoes not appear to be a metadata file!' % x)
-            raise SystemError
-            
-        tree = ET.ElementTree(root)
-        #pPrint(ET.dump(tree))
-        #pPrint(os.path.join(outDir, x))
-        tree.write(os.path.join(outDir, x))
+    pPrint('Processing tables in a pipeline of export, update and import threads')
+    tempDoc, tDefsDict = loadResources()
+
+    #arcpy is not thread safe: the terms of the tables and the lookup tables are read
+    #here, so the update thread never opens a cursor while the others export and import
+    tableTerms = dict(tableTerms)
+    for dsPath in tables:
+        table = dsPath[0]
+        if not table in tableTerms and not stageDone(table, 'update'):
+            with timer.table(table, backend):
+                with timer.stage('domains'):
+                    tableTerms[table] = scanTerms(dsPath[1], fieldNameList(dsPath[1]), options.distinct, backend)
+    lookups.load()
+
+    def export(dsPath):
+        exportTable(dsPath[0], dsPath[1])
+        return dsPath
+
+    def update(dsPath):
+        return dsPath, updateTableMetadata(dsPath[0], dsPath[1], tempDoc, tDefsDict, tableTerms.get(dsPath[0]))
+
+    def load(item):
+        dsPath, mdXML = item
+        importTable(dsPath[0], dsPath[1])
+        return mdXML
+
+    stages = [Stage('export', export), Stage('update', update), Stage('import', load)]
+    xmls, seconds = runPipeline(tables, stages)
+    reportPipeline(stages, seconds, pPrint)
+    return xmls
+
+@instrumented
+def addTemplateItems(root, x, tempDoc):
+    """Takes a list of metadata elements from a template XML and migrates 
+       them to a FGDC metadata document (the root element of the XML file x).
+       tempDoc holds the template sections prepared once for all documents"""
+
+    fName = os.path.splitext(os.path.basename(x))[0]
+    GDB = os.path.basename(gdb)
+    if root.tag == 'metadata':
+        #remove the existing elements
+        for elementName in templateElements:
+            #if root.find(elementName) is not None:
+            if root.find(elementName): 
+                root.remove(root.find(elementName))
+
+            #now splice in the sections prepared from the template, only the idinfo title
+            #is made for this file.
+            #need to go trough one by one because two of the elements we insert by index
+            #and the other two we simply append in order to maintain the FGDC order
+            if elementName == 'idinfo':
+                copyElem = tempDoc.section(elementName, 'Metadata for %s in %s' % (fName, GDB))
+            else:
+                copyElem = tempDoc.section(elementName)
+            if copyElem is None:
+                continue
+            if elementName == 'idinfo':
+                root.insert(0, copyElem)
+            elif elementName == 'dataqual':
+                root.insert(1, copyElem)
+            elif elementName == 'distinfo':
+                root.append(copyElem)
+            elif elementName == 'metainfo':
+                root.append(copyElem)
+    else:
+        pPrint('%s\ndoes not appear to be a metadata file!' % x)
+        raise SystemError
+    return root
 		
-def getElementDictionary(elemIter):
-    """Makes a dictionary of {Entity or Attribute label: Entity or Attribute element} for items from NCGMP09_field_definitions
-       Must be passed a variable created by Element.iter(<value>)"""
-    elemDict = {}
-    for elem in elemIter:
-        childDict = {}
-        entity = elem.find('enttyp')
-        label = entity[0].text
-        childDict[label] = entity
-        children = elem.iter('attr')
-        for child in children:
-            childDict[child[0].text] = child
-        elemDict[label] = childDict
-    return elemDict
-
-def addTableFieldDefinitions():
+@instrumented
+def addTableFieldDefinitions(root, f, tDefsDict):
     """Add table and field definitions for (mostly) NCGMP09 controlled tables and fields
        User may add their own definitions for tables and fields which they have added by 
        modifying /docs/NCGMP09_field_definitions.xml"""
 
-    #Start by making a dictionary of table names where the definitions are the element objects so that we
-    #can easily search on table name and get a valid ElementTree element to copy later
-    defsDoc = ET.parse(NCGMP09_defs)
-    tDets = defsDoc.iter('detailed')
-    tDefsDict = getElementDictionary(tDets)
-
-    #Now go through newly exported XML files:
-    for f in xmlList:
-        pPrint('Looking in the template file for table and field definitions to add to: \n\t%s' % f)
-        #make an ElementTree
-        root = ET.parse(f).getroot()
-        #find the enttyp element - there 'should' be only one per feature class or table metadata record
-        #but we'll iterate in case there are more
-        fDets = root.iter('detailed')
-        for fDet in fDets:
-            entity = fDet.find('enttyp')
-            label = entity[0].text
-            #if there is a match between this entity.text and a key in the dictionary then we have a table 
-            #definition in the template file
-            if label in tDefsDict.keys():
-                #remove the entity/table element and swap in the one from the dictionary
-                pPrint('\tUpdating the definition for: \n\t\t%s' % label)
-                i = list(fDet).index(entity)
-                fDet.remove(entity)
-                copyElem = copy.deepcopy(tDefsDict[label][label])
-                fDet.insert(i, copyElem)
-                #now find all matching fields within this table/entity element
-                atts = fDet.iter('attr')
-                for att in atts:
-                    attLabel = att[0].text
-                    if attLabel in tDefsDict[label].keys():
-                        pPrint('\t\t%s' % attLabel)
-                        i = list(fDet).index(att)
-                        fDet.remove(att)
-                        copyElem = copy.deepcopy(tDefsDict[label][att[0].text])
-                        fDet.insert(i, copyElem)
-            
-        tree = ET.ElementTree(root)
-        tree.write(f)
-        
-def mpXML():
-    for f in xmlList:
-        fName = os.path.splitext(os.path.basename(f))[0]
-        outPath = os.path.join(outDir, fName + '_err.txt')
-        call([mp, '-e', outPath, f])
-        
-def mpTXT():
-    for f in xmlList:
-        fName = os.path.splitext(os.path.basename(f))[0]
-        outPath = os.path.join(outDir, fName + '_meta.txt')
-        call([mp, '-t', outPath, f])
+    pVerbose('Looking in the template file for table and field definitions to add to: \n\t%s' % f)
+    #swap in the entity/table and attribute/field definitions from the index in one pass
+    for label, attLabels in mergeDefinitions(root, tDefsDict):
+        pVerbose('\tUpdating the definition for: \n\t\t%s' % label)
+        for attLabel in attLabels:
+            pVerbose('\t\t%s' % attLabel)
+    return root
         
-def mpFAQ():
-    for f in xmlList:
-        fName = os.path.splitext(os.path.basename(f))[0]
-        outPath = os.path.join(outDir, fName + '_faq.html')
-        call([mp, '-f', outPath, f])
-        
-def mpHTML():
-    for f in xmlList:
-        fName = os.path.splitext(os.path.basename(f))[0]
-        outPath = os.path.join(outDir, fName + '_meta.html')
-        call([mp, '-h', outPath, f])
+def poolExecutable():
+    """Worker processes must be started with python.exe; inside ArcMap or ArcCatalog
+       sys.executable is the application, not python"""
+
+    if os.name == 'nt' and not os.path.basename(sys.executable).lower() in ('python.exe', 'pythonw.exe'):
+        multiprocessing.set_executable(os.path.join(sys.exec_prefix, 'python.exe'))
+
+@instrumented
+def mpOutputs():
+    """Writes the validation report and all of the requested output formats of every
+       XML file, with mp (several mp processes at a time) or with the native renderer,
+       which parses each file once for all of its outputs.
+       Returns the names of the tables whose outputs could not all be written"""
+
+    #formats for mp and for the native renderer
+    formats = []
+    native = []
+    #if the user wants the new xmls files validated
+    if validate:
+        (native if options.validator == 'native' else formats).append('ERR')
+    #plain text, HTML and FAQ-formed HTML versions of the metadata
+    for outFormat in ['TXT', 'HTML', 'FAQ']:
+        if outFormat in outList:
+            (native if options.renderer == 'native' else formats).append(outFormat)
+    #files rendered by the run being resumed are left alone
+    tableOf = lambda f: os.path.splitext(os.path.basename(f))[0]
+    todo = [f for f in xmlList if not stageDone(tableOf(f), 'render')]
+    if len(todo) < len(xmlList):
+        pPrint('%d files were rendered by the run being resumed' % (len(xmlList) - len(todo)))
+    if not todo or not (native or formats):
+        return []
+
+    failed = set()
+    if native:
+        with timer.call('renderFiles'):
+            results, seconds = renderFiles(todo, outDir, native, options.mp_workers)
+        reportRender(results, seconds, pPrint)
+        for xml, errors, failure, fileSeconds in results:
+            timer.tableTime(tableOf(xml), 'render', fileSeconds)
+        failed.update(xml for xml, errors, failure, fileSeconds in results if failure)
+    if formats:
+        with timer.call('runMP'):
+            results, seconds = runMP(mp, todo, outDir, formats, options.mp_workers)
+        reportMP(results, seconds, pPrint)
+        for r in results:
+            timer.tableTime(tableOf(r.xml), 'mp', r.seconds)
+        failed.update(r.xml for r in results if not r.ok)
+    for f in todo:
+        if not f in failed:
+            journal.done(tableOf(f), 'render')
+    return sorted(tableOf(f) for f in failed)
+
+def parseOptions(args):
+    """Parses the optional switches that may follow the six tool parameters"""
+
+    parser = argparse.ArgumentParser(prog='ncgmp09_update_md.py')
+    parser.add_argument('--distinct', action='store_true',
+                        help='ask the data source for the distinct terms in controlled fields (file and enterprise gdbs)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of worker processes, each processing whole tables; 0 for one per CPU (default 1)')
+    parser.add_argument('--pipeline', action='store_true',
+                        help='overlap the export, update and import of the tables in three threads '
+                             'connected by queues; only used with one worker process')
+    parser.add_argument('--resume', action='store_true',
+                        help='carry on from where a failed run stopped, skipping the stages of each table '
+                             'its journal (ncgmp09_journal.jsonl in the output folder) says were finished')
+    parser.add_argument('--incremental', action='store_true',
+                        help='only rebuild the tables whose terms, definitions or template changed since the last run')
+    parser.add_argument('--watch', action='store_true',
+                        help='after the run, keep watching the gdb and rebuild the tables whose terms or definitions '
+                             'change each time it is saved, with everything kept loaded (implies --incremental)')
+    parser.add_argument('--stream-domains', action='store_true',
+                        help='write enumerated domains straight to the XML files instead of building them in memory')
+    parser.add_argument('--mp-workers', type=int, default=0,
+                        help='number of mp (or native renderer) processes run at a time; 0 for one per CPU (default)')
+    parser.add_argument('--mp', default=None,
+                        help='path to the mp executable to use instead of docs/mp.exe')
+    parser.add_argument('--report', default=None,
+                        help='write a JSON report of the run: stage and function timings and, for each table, '
+                             'time per stage, cursors, rows read, XML bytes and peak memory')
+    parser.add_argument('--profile', default=None,
+                        help='write a cProfile dump of the main process to this file')
+    parser.add_argument('--verbose', action='store_true',
+                        help='print every file written and every field and definition updated')
+    parser.add_argument('--backend', choices=['auto', 'arcpy', 'sqlite'], default='auto',
+                        help='read the database with arcpy or sqlite3; auto uses sqlite3 for .gpkg, .sqlite and .db files')
+    parser.add_argument('--export', choices=['native', 'arcgis'], default='native',
+                        help='build the metadata skeleton from the field schemas and spatial reference (default) '
+                             'or export the existing metadata with ExportMetadata_conversion and ARCGIS2FGDC.xml')
+    parser.add_argument('--validator', choices=['mp', 'native'], default='mp' if os.name == 'nt' else 'native',
+                        help='validate with mp -e or with the built-in structural checks (default mp on Windows, native elsewhere)')
+    parser.add_argument('--renderer', choices=['mp', 'native'], default='mp' if os.name == 'nt' else 'native',
+                        help='write the TXT, HTML and FAQ outputs with mp or the built-in renderer (default mp on Windows, native elsewhere)')
+    return parser.parse_args(args)
+
+def toolBoolean(text):
+    """A boolean tool parameter: ArcGIS passes 'true' or 'false', the command line may
+       also have yes/no or 1/0"""
+
+    return text.strip().lower() in ('true', 'yes', '1')
+
+def configure(argv):
+    """Sets the global variables of a run from the tool parameters"""
+
+    global gdb, template, addDefs, validate, outList, outDir, options, toolArgs, undefinedTerms
+    global backend, gdbFolder, glossary, dataSources, DMU, lookups, fragments, toolFolder, docs, NCGMP09_defs, translator, mp
+
+    #Parameters and start
+    gdb = argv[1]       #path
+    template = argv[2]  #path
+    addDefs = toolBoolean(argv[3])   #true or false
+    validate = toolBoolean(argv[4])	#true or false
+    outList = argv[5]
+    outDir = argv[6]	#path
+    options = parseOptions(argv[7:])
+    toolArgs = list(argv)
+
+    #global variables
+    #tables are listed and read through arcpy or, for GeoPackages and SQLite databases, sqlite3
+    backend = CountingBackend(openBackend(gdb, options.backend))
+    gdbFolder = parentFolder(gdb)
+    glossary = os.path.join(gdb, 'Glossary')
+    dataSources = os.path.join(gdb, 'DataSources')
+    DMU = os.path.join(gdb, 'DescriptionOfMapUnits')
+    #Glossary, DMU and DataSources are each read once into dictionaries for all domain lookups
+    #and every (field, term) is resolved once
+    lookups = LookupIndex(glossary, DMU, dataSources, backend)
+    #enumerated domains rendered once and reused by every table with the same field and terms
+    fragments = FragmentCache()
+    toolFolder = os.path.dirname(os.path.dirname(os.path.abspath(argv[0])))
+    docs = os.path.join(toolFolder, 'docs')
+    NCGMP09_defs = os.path.join(docs, 'NCGMP09_entity_definitions.xml')
+    translator = os.path.join(docs, 'ARCGIS2FGDC.xml')
+    mp = options.mp or os.path.join(docs, 'mp.exe')
+    #table: {field: terms} of the terms with no definition
+    undefinedTerms = {}
+
+def updateGdb(manifest, workers, resume=False):
+    """Exports, updates and imports the metadata of the tables of the gdb and writes the
+       outputs. With a manifest only the tables whose inputs changed since it was saved
+       are rebuilt. Each stage of each table is checkpointed in the journal as it finishes;
+       with resume, the stages the journal of a failed run has finished are skipped.
+       Returns the tables rebuilt, all the tables and the tables whose outputs could not
+       be written; the journal is kept for --resume unless every table was rendered"""
+
+    global xmlList, xmlListcopy, journal
+
+    journal = Journal(outDir, dataHash([runHash(), gdb]), resume)
+    if journal.resumed:
+        pPrint('Resuming the run journaled in %s' % journal.path)
+    elif resume:
+        pPrint('No journal of a run with the same inputs in %s, starting from the beginning' % outDir)
+
+    #all feature classes and standalone tables, feature datasets excluded
+    allTables = tableList(gdb)
+    tables = allTables
+    tableTerms = {}
+
+    #in incremental mode only the tables whose inputs changed since the last run are rebuilt
+    if manifest is not None:
+        with timer.stage('manifest'):
+            tables, tableTerms, signatures = changedTables(allTables, manifest)
+        pPrint('%d of %d tables need to be rebuilt' % (len(tables), len(allTables)))
+
+    if workers > 1:
+        #export, update and import each table in its own worker process
+        with timer.stage('parallel'):
+            xmlList = processTablesParallel(tables, tableTerms, workers)
+    elif options.pipeline:
+        #export, update and import in three threads, each table moving on as soon as a stage is done
+        with timer.stage('pipeline'):
+            xmlList = processTablesPipelined(tables, tableTerms)
+    else:
+        #First, export metadata files for the objects in the geodatabase.
+        #Get the list of full paths to these files as xmlList
+        xmlList = exportMD(tables)
+
+        #parse each of the newly exported XML files once, add the template items if a template XML 
+        #was provided, the table and field definitions if the user wants them and the attribute domain 
+        #values from the Glossary, then write each file once
+        pPrint("Adding template items, definitions and attribute domains...")
+        updateMetadata(tables, tableTerms)
+        pPrint("Attributes domains added")
+
+        #import the xml files back in to the source feature classes and standalone tables
+        importMD(tables)
+    xmlListcopy = xmlList
+
+    #import the template/master metadata back into the gdb
+    gdbName = os.path.basename(gdb)
+    if template and tables and backend.storesMetadata and not journal.isDone(gdbName, 'import'):
+        with timer.stage('import'):
+            backend.importMetadata(template, gdb)
+        journal.done(gdbName, 'import')
+
+    #validate and write the text, HTML and FAQ versions of the new xml files
+    with timer.stage('mp'):
+        unrendered = mpOutputs()
+
+    #remember what the rebuilt tables were built from, the tables not rendered are rebuilt next time
+    if manifest is not None:
+        for dsPath in tables:
+            if not dsPath[0] in unrendered:
+                manifest.update(dsPath[0], signatures[dsPath[0]])
+        manifest.prune([dsPath[0] for dsPath in allTables])
+        manifest.save()
+
+    if unrendered:
+        #the journal is kept so the outputs can be written with --resume
+        pPrint('The run is incomplete, the outputs of %d tables were not written: %s' % (len(unrendered), ', '.join(unrendered)))
+        pPrint('Run again with --resume to write them')
+        journal.close()
+    else:
+        #everything is done, there is nothing to resume
+        journal.finish()
+    return tables, allTables, unrendered
+
+def watchGdb(manifest):
+    """Watch mode: keeps the backend, the catalog snapshot, the lookup indexes and the parsed
+       template and definitions in memory and, each time the gdb is saved, rebuilds the
+       metadata of the tables whose terms or definitions changed, until interrupted.
+       Tables are processed in this process (or the pipeline threads), not a worker pool,
+       so nothing has to be loaded again. A rebuild that fails is reported and the gdb
+       watched again; its tables are rebuilt the next time it is saved"""
+
+    global catalog, fragments, timer
+
+    watcher = watcherFor(gdb)
+    if watcher is None:
+        pPrint('%s cannot be watched, only file gdbs, GeoPackages and SQLite databases can' % gdb)
+        return
+    pPrint('Watching %s for changes (%s), press Ctrl+C to stop' % (gdb, watcher.name))
+    schema = backend.schemaVersion()
+    try:
+        while True:
+            names = watcher.wait()
+            started = time.time()
+            pPrint('\n%s changed: %s' % (os.path.basename(gdb), ', '.join(sorted(names))))
+            timer = StageTimer()
+            undefinedTerms.clear()
+            try:
+                #terms and definitions may have been edited, the lookup tables are read again and
+                #the domains rendered again; the catalog only if the schema may have changed
+                lookups.refresh()
+                fragments = FragmentCache()
+                version = backend.schemaVersion()
+                if version is None or version != schema:
+                    with timer.stage('catalog'):
+                        catalog = Catalog(gdb, backend)
+                    schema = version
+                tables, allTables, unrendered = updateGdb(manifest, 1)
+                pPrint('%d of %d tables updated in %.2f s' % (len(tables), len(allTables), time.time() - started))
+            except Exception:
+                #eg, the database is locked by the editor or arcpy failed while it was saving
+                pPrint('Updating the metadata failed, still watching:\n%s' % traceback.format_exc())
+                if journal is not None:
+                    journal.close()
+            if backend.storesMetadata:
+                #the metadata imported into the gdb is not an edit, a save made while the
+                #tables were being rebuilt is only picked up by the next one
+                watcher.discard()
+    except KeyboardInterrupt:
+        pPrint('Stopped watching %s' % gdb)
+    finally:
+        watcher.close()
+
+def run(argv):
+    """Updates the metadata of one gdb. argv holds the tool parameters and options as on
+       the command line. Returns the summary of the run: its parameters and totals, the
+       undefined terms and the StageTimer. In watch mode the summary is returned when
+       watching stops"""
+
+    global catalog, timer
+
+    configure(argv)
+    poolExecutable()
+    timer = StageTimer()
+    started = time.time()
+
+    #profile the main process, worker processes are not included
+    profiler = None
+    if options.profile:
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    pPrint('NCGMP09_update_md.py')
+    pPrint('Geodatabase: %s' % gdb)
+
+    workers = options.workers
+    if workers < 1:
+        workers = multiprocessing.cpu_count()
+
+    #describe every object in the gdb once, all the stages read names, paths and fields from the snapshot
+    with timer.stage('catalog'):
+        catalog = Catalog(gdb, backend)
+    if not backend.storesMetadata:
+        pPrint('The %s backend cannot store metadata, the XML files are left in %s' % (backend.name, outDir))
+
+    #the manifest of the last run, watch mode keeps it in memory between updates
+    manifest = None
+    if options.incremental or options.watch:
+        manifest = Manifest(outDir)
+    tables, allTables, unrendered = updateGdb(manifest, workers, options.resume)
+
+    timer.report(pPrint)
+    if fragments.reused:
+        pPrint('\tDomains rendered: %d, reused from other tables: %d' % (fragments.rendered, fragments.reused))
+
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(options.profile)
+        pPrint('Profile written to %s' % options.profile)
+    summary = {'gdb': gdb, 'outDir': outDir, 'backend': backend.name,
+               'options': vars(options), 'workers': workers,
+               'tablesRebuilt': len(tables), 'tablesTotal': len(allTables), 'tablesNotRendered': unrendered,
+               'seconds': time.time() - started,
+               'started': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(started)),
+               'mainProcess': {'cursors': backend.cursors, 'rowsRead': backend.rowsRead,
+                               'rowsInserted': backend.rowsInserted},
+               'domainsRendered': fragments.rendered, 'domainsReused': fragments.reused,
+               'undefinedTerms': undefinedTerms}
+    if options.report:
+        writeReport(options.report, timer, summary)
+        pPrint('Run report written to %s' % options.report)
+    summary['timer'] = timer
+
+    if options.watch:
+        watchGdb(manifest)
+    pPrint('Done!')
+    return summary
+
+def main():
+    summary = run(sys.argv)
+    #a run that did not write every output failed
+    if summary['tablesNotRendered']:
+        sys.exit(1)
 
 #precondition
 validate = False
 
-#Parameters and start
-gdb = sys.argv[1]       #path
-template = sys.argv[2]  #path
-addDefs = sys.argv[3]   #true or false
-validate = sys.argv[4]	#true or false
-outList = sys.argv[5]
-outDir = sys.argv[6]	#path
-
-#global variables
-arcpy.env.workspace = gdb
-gdbFolder = parentFolder(gdb)
-glossary = os.path.join(gdb, 'Glossary')
-dataSources = os.path.join(gdb, 'DataSources')
-DMU = os.path.join(gdb, 'DescriptionOfMapUnits')
-parentFolder = os.path.dirname(os.path.dirname(os.path.abspath(sys.argv[0])))
-docs = os.path.join(parentFolder, 'docs')
-NCGMP09_defs = os.path.join(docs, 'NCGMP09_entity_definitions.xml')
-translator = os.path.join(docs, 'ARCGIS2FGDC.xml')
-mp = os.path.join(docs, 'mp.exe')
-
 controlledFields =["Type", "MapUnit", "IdentityConfidence", "ExistenceConfidence", "GeneralLithology",
              "GeneralLithologyConfidence", "ParagraphStyle", "Property", "PropertyValue", 
              "Qualifier", "Event", "TimeScale", "Lithology", "ProportionValue", "ProportionTerm",
@@ -498,49 +861,27 @@ fcIndex = {'idinfo':0, 'dataqual':1, 'spdoinfo':2, 'spref':3, 'eainfo':4, 'disti
 tabIndex = {'idinfo':0, 'dataqual':1, 'eainfo':2, 'distinfo':3, 'metainfo':4}
 templateElements = ['idinfo', 'dataqual', 'distinfo', 'metainfo']
 
-pPrint('NCGMP09_update_md.py')
-pPrint('Geodatabase: %s' % gdb)
-
-#First, export metadata files for all objects in the geodatabase,
-#feature datasets excluded. Get the list of full paths to these files as xmlList
-xmlList = exportMD(gdb)
-xmlListcopy = xmlList
+#time each stage of the run
+timer = StageTimer()
 
-#if a template XML was provided, update the newly exported XML files
-pPrint("Adding template items...")
-if template:
-    addTemplateItems()
+#catalog snapshot of the gdb, made once per run
+catalog = None
 
-#if the user wants table and field definitions:
-if addDefs:
-    #Create a couple global variables we don't need outside of this option
-    addTableFieldDefinitions()
+#data-access backend of the gdb
+backend = None
 
-#add attribute domain values to the XML files from the Glossary
-addAttributeDomains()
-pPrint("Attributes domains added")
+#checkpoints of the run, a Journal in the main process
+journal = None
 
-#import the xml files back in to the source feature classes and standalone tables
-importMD(gdb)
+#messages of a worker process, None in the main process
+workerMessages = None
 
-#import the template/master metadata back into the gdb
-if template:
-    arcpy.ImportMetadata_conversion(template, "FROM_FGDC", gdb)
+#template document and definitions dictionary of a worker process
+resources = (None, None)
 
-#if the user wants the new xmls files validated
-if validate:
-    mpXML()
-
-#if the user wants a plain text version of the metadata
-if 'TXT' in outList:
-    mpTXT()    
-
-#if the user wants an HTML version of the metadata
-if 'HTML' in outList:
-    mpHTML()
-    
-#if the user wants an FAQ-formed HTML file
-if 'FAQ' in outList:
-    mpFAQ()
+#(class name, path): (modification time, object) of the template and definitions loaded by this process
+loadedFiles = {}
 
-pPrint('Done!')
\ No newline at end of file
+#the main process runs the tool, worker processes (which import this script) only run processTable
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+#-------------------------------------------------------------------------------
+# Name:        ncgmp09_validate.py
+# Purpose:     In-process structural validator for the FGDC CSDGM documents
+#              written by ncgmp09_update_md.py, a fast alternative to
+#              running mp.exe -e on every file (and one that runs on Linux).
+#              Checks the order of the metadata sections, required and
+#              repeated children of the elements this tool writes, the
+#              eainfo/detailed/attr/attrdomv structure and empty elements.
+#              The _err.txt reports are written by ncgmp09_render.py.
+#
+# Author:      ethoms
+#
+# Created:     17/10/2026
+# Copyright:   no copyright
+# Licence:     Creative Commons
+#-------------------------------------------------------------------------------
+#!/usr/bin/env python
+
+
+#unbounded number of occurrences
+N = None
+
+#the map projections of mapproj, in order; one of them holds the projection parameters
+mapProjections = ('albers', 'azimequi', 'equicon', 'equirect', 'gvnsp', 'gnomonic', 'lamberta', 'lambertc',
+                  'mercator', 'modsak', 'miller', 'obqmerc', 'orthogr', 'polarst', 'polycon', 'robinson',
+                  'sinusoid', 'spaceobq', 'stereo', 'transmer', 'vdgrin', 'mapprojp')
+
+#element: [(child, min occurrences, max occurrences)] in the order the standard requires
+schema = {
+    'metadata': [('idinfo', 1, 1), ('dataqual', 0, 1), ('spdoinfo', 0, 1), ('spref', 0, 1),
+                 ('eainfo', 0, 1), ('distinfo', 0, N), ('metainfo', 1, 1)],
+    'idinfo': [('citation', 1, 1), ('descript', 1, 1), ('timeperd', 1, 1), ('status', 1, 1),
+               ('spdom', 0, 1), ('keywords', 1, 1), ('accconst', 1, 1), ('useconst', 1, 1),
+               ('ptcontac', 0, 1), ('browse', 0, N), ('datacred', 0, 1), ('secinfo', 0, 1),
+               ('native', 0, 1), ('crossref', 0, N)],
+    'citation': [('citeinfo', 1, 1)],
+    'citeinfo': [('origin', 1, N), ('pubdate', 1, 1), ('pubtime', 0, 1), ('title', 1, 1),
+                 ('edition', 0, 1), ('geoform', 0, 1), ('serinfo', 0, 1), ('pubinfo', 0, 1),
+                 ('othercit', 0, 1), ('onlink', 0, N), ('lworkcit', 0, 1)],
+    'descript': [('abstract', 1, 1), ('purpose', 1, 1), ('supplinf', 0, 1)],
+    'timeperd': [('timeinfo', 1, 1), ('current', 1, 1)],
+    'status': [('progress', 1, 1), ('update', 1, 1)],
+    'keywords': [('theme', 1, N), ('place', 0, N), ('stratum', 0, N), ('temporal', 0, N)],
+    'theme': [('themekt', 1, 1), ('themekey', 1, N)],
+    'place': [('placekt', 1, 1), ('placekey', 1, N)],
+    'dataqual': [('attracc', 0, 1), ('logic', 1, 1), ('complete', 1, 1), ('posacc', 0, 1),
+                 ('lineage', 1, 1), ('cloud', 0, 1)],
+    'spref': [('horizsys', 0, 1), ('vertdef', 0, 1)],
+    'horizsys': [('geograph', 0, 1), ('planar', 0, N), ('local', 0, 1), ('geodetic', 0, 1)],
+    'geograph': [('latres', 1, 1), ('longres', 1, 1), ('geogunit', 1, 1)],
+    'planar': [('mapproj', 0, 1), ('gridsys', 0, 1), ('localp', 0, 1), ('planci', 1, 1)],
+    'mapproj': [('mapprojn', 1, 1)] + [(tag, 0, 1) for tag in mapProjections],
+    'gridsys': [('gridsysn', 1, 1), ('utm', 0, 1), ('ups', 0, 1), ('spcs', 0, 1), ('arcsys', 0, 1), ('othergrd', 0, 1)],
+    'utm': [('utmzone', 1, 1), ('transmer', 1, 1)],
+    'transmer': [('sfctrmer', 1, 1), ('longcm', 1, 1), ('latprjo', 1, 1), ('feast', 1, 1), ('fnorth', 1, 1)],
+    'albers': [('stdparll', 1, 2), ('longcm', 1, 1), ('latprjo', 1, 1), ('feast', 1, 1), ('fnorth', 1, 1)],
+    'lambertc': [('stdparll', 1, 2), ('longcm', 1, 1), ('latprjo', 1, 1), ('feast', 1, 1), ('fnorth', 1, 1)],
+    'mercator': [('stdparll', 0, 1), ('sfequat', 0, 1), ('longcm', 1, 1), ('feast', 1, 1), ('fnorth', 1, 1)],
+    'equirect': [('stdparll', 1, 1), ('longcm', 1, 1), ('feast', 1, 1), ('fnorth', 1, 1)],
+    'planci': [('plance', 1, 1), ('coordrep', 0, 1), ('distbrep', 0, 1), ('plandu', 1, 1)],
+    'coordrep': [('absres', 1, 1), ('ordres', 1, 1)],
+    'geodetic': [('horizdn', 0, 1), ('ellips', 1, 1), ('semiaxis', 1, 1), ('denflat', 1, 1)],
+    'eainfo': [('detailed', 0, N), ('overview', 0, N)],
+    'detailed': [('enttyp', 1, 1), ('attr', 0, N)],
+    'enttyp': [('enttypl', 1, 1), ('enttypd', 1, 1), ('enttypds', 1, 1)],
+    'attr': [('attrlabl', 1, 1), ('attrdef', 1, 1), ('attrdefs', 1, 1), ('attrdomv', 1, N),
+             ('begdatea', 0, 1), ('enddatea', 0, 1), ('attrvai', 0, 1), ('attrmfrq', 0, 1)],
+    'attrdomv': [('edom', 0, 1), ('rdom', 0, 1), ('codesetd', 0, 1), ('udom', 0, 1)],
+    'edom': [('edomv', 1, 1), ('edomvd', 1, 1), ('edomvds', 1, 1), ('attr', 0, N)],
+    'rdom': [('rdommin', 1, 1), ('rdommax', 1, 1), ('attrunit', 0, 1), ('attrmres', 0, 1), ('attr', 0, N)],
+    'codesetd': [('codesetn', 1, 1), ('codesets', 1, 1)],
+    'distinfo': [('distrib', 1, 1), ('resdesc', 0, 1), ('distliab', 1, 1), ('stdorder', 0, N),
+                 ('custom', 0, 1), ('techpreq', 0, 1), ('availabl', 0, 1)],
+    'metainfo': [('metd', 1, 1), ('metrd', 0, 1), ('metfrd', 0, 1), ('metc', 1, 1), ('metstdn', 1, 1),
+                 ('metstdv', 1, 1), ('mettc', 0, 1), ('metac', 0, 1), ('metuc', 0, 1), ('metsi', 0, 1),
+                 ('metextns', 0, N)],
+}
+
+#element: (children of which a number between min and max must be present)
+choices = {
+    'attrdomv': (('edom', 'rdom', 'codesetd', 'udom'), 1, 1),
+    'eainfo': (('detailed', 'overview'), 1, N),
+    'horizsys': (('geograph', 'planar', 'local'), 1, N),
+    'planar': (('mapproj', 'gridsys', 'localp'), 1, 1),
+    'mapproj': (mapProjections, 1, 1),
+    'gridsys': (('utm', 'ups', 'spcs', 'arcsys', 'othergrd'), 1, 1),
+    'mercator': (('stdparll', 'sfequat'), 1, 1),
+    'planci': (('coordrep', 'distbrep'), 1, 1),
+}
+
+#element: {child: position} so the order check is a dictionary lookup
+positions = dict((tag, dict((child[0], i) for i, child in enumerate(rule))) for tag, rule in schema.items())
+
+class Report(object):
+    """The errors and warnings found in one document"""
+
+    def __init__(self):
+        self.lines = []
+        self.errors = 0
+        self.warnings = 0
+
+    def error(self, path, message):
+        self.errors += 1
+        self.lines.append('Error: %s: %s' % (path, message))
+
+    def warning(self, path, message):
+        self.warnings += 1
+        self.lines.append('Warning: %s: %s' % (path, message))
+
+    def text(self):
+        return '\n'.join(self.lines + ['%d errors, %d warnings' % (self.errors, self.warnings)]) + '\n'
+
+def elementPath(path, elem):
+    """The path of an element for messages. attr elements carry their label so the
+       field can be found"""
+
+    name = '%s/%s' % (path, elem.tag) if path else elem.tag
+    if elem.tag == 'attr' and elem.find('attrlabl') is not None:
+        name = '%s(%s)' % (name, elem.find('attrlabl').text)
+    return name
+
+def checkElement(elem, path, report):
+    """Checks one element and everything below it"""
+
+    here = elementPath(path, elem)
+    children = [child for child in elem if isinstance(child.tag, str)]
+
+    #leaves must have a value
+    if not children and not (elem.text or '').strip():
+        report.error(here, 'empty element')
+
+    if elem.tag in schema:
+        rule = schema[elem.tag]
+        order = positions[elem.tag]
+        counts = {}
+        last = -1
+        for child in children:
+            if not child.tag in order:
+                report.error(here, '%s is not a recognized child of %s' % (child.tag, elem.tag))
+                continue
+            counts[child.tag] = counts.get(child.tag, 0) + 1
+            if order[child.tag] < last:
+                report.error(here, '%s is out of order' % child.tag)
+            last = max(last, order[child.tag])
+
+        for tag, least, most in rule:
+            count = counts.get(tag, 0)
+            if count < least:
+                report.error(here, 'missing required element %s' % tag)
+            elif most is not None and count > most:
+                report.error(here, '%s appears %d times, at most %d allowed' % (tag, count, most))
+
+        if elem.tag in choices:
+            tags, least, most = choices[elem.tag]
+            count = sum(counts.get(tag, 0) for tag in tags)
+            if count < least or (most is not None and count > most):
+                report.error(here, '%s must have %s of %s' % (elem.tag, 'one' if most == 1 else 'at least one', ', '.join(tags)))
+
+    for child in children:
+        checkElement(child, here, report)
+
+def validate(root):
+    """Returns a Report for a metadata document (its root element)"""
+
+    report = Report()
+    if root.tag != 'metadata':
+        report.error(root.tag, 'root element is not metadata')
+    checkElement(root, '', report)
+    return report
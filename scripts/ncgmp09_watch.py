@@ -0,0 +1,169 @@
+#-------------------------------------------------------------------------------
+# Name:        ncgmp09_watch.py
+# Purpose:     Waits for a geodatabase to change on disk, for the watch mode of
+#              ncgmp09_update_md.py. A file gdb is a folder, every file in it
+#              is watched; a GeoPackage or SQLite database is watched through
+#              its folder, for the database file and its -wal and -journal
+#              files. On Linux the folder is watched with inotify (through
+#              ctypes, nothing to install), elsewhere, or if inotify cannot be
+#              used, its files are polled for changes of size or modification
+#              time. Lock files written by readers, including this tool, are
+#              ignored.
+#
+# Author:      ethoms
+#
+# Created:     17/10/2026
+# Copyright:   no copyright
+# Licence:     Creative Commons
+#-------------------------------------------------------------------------------
+#!/usr/bin/env python
+
+import os
+import sys
+import time
+import struct
+import select
+
+#inotify events that mean a file was written, created, deleted or renamed
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+watchMask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+#wd, mask, cookie, length of the name that follows
+eventHeader = struct.Struct('iIII')
+
+#files changed by readers of a database rather than by edits
+ignoredSuffixes = ('.lock', '-shm')
+
+class Watcher(object):
+    """Waits for changes to the files of a folder that pass a filter"""
+
+    name = None
+
+    def __init__(self, folder, accept):
+        self.folder = folder
+        self.accept = accept
+
+    def changes(self, timeout):
+        """Returns the names of the files changed within timeout seconds (None, wait for as long
+           as it takes), an empty set if nothing changed"""
+        raise NotImplementedError
+
+    def wait(self, quiet=0.25):
+        """Blocks until a file changes, then until nothing has changed for quiet seconds, as
+           saving an edit writes several files. Returns the names of the files changed"""
+
+        names = set()
+        while not names:
+            names = self.changes(None)
+        while True:
+            more = self.changes(quiet)
+            if not more:
+                return names
+            names |= more
+
+    def discard(self, quiet=0.25):
+        """Forgets the changes made so far, once nothing has changed for quiet seconds,
+           eg, those made by this tool storing the metadata back in the gdb"""
+
+        while self.changes(quiet):
+            pass
+
+    def close(self):
+        pass
+
+class InotifyWatcher(Watcher):
+    """Watches a folder with the Linux inotify API"""
+
+    name = 'inotify'
+
+    def __init__(self, folder, accept):
+        import ctypes
+        import ctypes.util
+
+        Watcher.__init__(self, folder, accept)
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = libc.inotify_init()
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init failed')
+        path = folder if isinstance(folder, bytes) else folder.encode(sys.getfilesystemencoding())
+        if libc.inotify_add_watch(self.fd, path, watchMask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, 'inotify_add_watch failed for %s' % folder)
+
+    def changes(self, timeout):
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return set()
+        data = os.read(self.fd, 65536)
+        names = set()
+        offset = 0
+        while offset + eventHeader.size <= len(data):
+            wd, mask, cookie, length = eventHeader.unpack_from(data, offset)
+            offset += eventHeader.size
+            name = data[offset:offset + length].rstrip(b'\0').decode(sys.getfilesystemencoding(), 'replace')
+            offset += length
+            if name and self.accept(name):
+                names.add(name)
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+class PollingWatcher(Watcher):
+    """Watches a folder by comparing the size and modification time of its files every interval seconds"""
+
+    name = 'polling'
+
+    def __init__(self, folder, accept, interval=1.0):
+        Watcher.__init__(self, folder, accept)
+        self.interval = interval
+        self.state = self.snapshot()
+
+    def snapshot(self):
+        state = {}
+        for name in os.listdir(self.folder):
+            if not self.accept(name):
+                continue
+            try:
+                info = os.stat(os.path.join(self.folder, name))
+            except OSError:
+                #deleted since it was listed
+                continue
+            state[name] = (info.st_size, info.st_mtime)
+        return state
+
+    def changes(self, timeout):
+        while True:
+            time.sleep(self.interval if timeout is None else min(timeout, self.interval))
+            state = self.snapshot()
+            names = set(name for name in set(state) | set(self.state) if state.get(name) != self.state.get(name))
+            self.state = state
+            if names or timeout is not None:
+                return names
+
+def watcherFor(gdb, interval=1.0):
+    """Returns a Watcher for the files of a file gdb, GeoPackage or SQLite database,
+       None for anything else (eg, an enterprise gdb connection)"""
+
+    if os.path.isdir(gdb):
+        folder = gdb
+        accept = lambda name: not name.endswith(ignoredSuffixes)
+    elif os.path.isfile(gdb) and not gdb.lower().endswith('.sde'):
+        folder = os.path.dirname(os.path.abspath(gdb))
+        base = os.path.basename(gdb)
+        accept = lambda name: name in (base, base + '-wal', base + '-journal')
+    else:
+        return None
+
+    if sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(folder, accept)
+        except (OSError, AttributeError):
+            #no inotify in this libc or the watch limit was reached
+            pass
+    return PollingWatcher(folder, accept, interval)